@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Union
 
 import numpy as np
 
@@ -9,33 +9,141 @@ def run_ngm(
     M_novax: np.ndarray,
     n: np.ndarray,
     n_vax: np.ndarray,
-    ve: float,
+    ve: Union[float, np.ndarray],
+    ve_infectiousness: Union[float, np.ndarray] = 0.0,
 ) -> dict[str, Any]:
     """
     Calculate Re and distribution of infections
 
+    Vaccine efficacies can vary by group, or by product and group, as in
+    `vaccinate_M`. Scenarios can be batched along leading axes of `M_novax` and
+    `n_vax`, in which case all of them are solved together.
+
     Args:
         M_novax: Next Generation Matrix in the absence of administering any vaccines
         n (np.array): Population sizes for each group
-        n_vax (np.array): Number of people vaccinated in each group
-        ve (float): Vaccine efficacy
+        n_vax (np.array): Number of people vaccinated in each group, or, with
+            efficacies by product, with each product in each group
+        ve (float or np.array): Vaccine efficacy against infection
+        ve_infectiousness (float or np.array): Vaccine efficacy against onward
+            transmission by vaccinated people who are infected
 
     Returns:
         dict: Contains dominant eigenvalue, dominant eigenvector, and adjusted NGM accounting for vaccination
     """
+    M_novax = np.asarray(M_novax)
+    n = np.asarray(n)
+    n_vax = np.asarray(n_vax)
     n_groups = len(n)
-    assert len(n_vax) == n_groups
-    assert M_novax.shape[0] == n_groups
-    assert M_novax.shape[1] == n_groups
-    assert all(n >= n_vax), "Vaccinated cannot exceed population size"
+    assert n_vax.shape[-1] == n_groups
+    assert M_novax.shape[-2:] == (n_groups, n_groups)
+    if max(np.ndim(ve), np.ndim(ve_infectiousness)) == 2:
+        assert (n >= n_vax.sum(axis=-2)).all(), (
+            "Vaccinated cannot exceed population size"
+        )
+    else:
+        assert (n >= n_vax).all(), "Vaccinated cannot exceed population size"
 
     # eigen analysis
-    M_vax = vaccinate_M(M=M_novax, p_vax=n_vax / n, ve=ve)
-    eigen = ngm.linalg.dominant_eigen(M_vax)
+    M_vax = vaccinate_M(
+        M=M_novax, p_vax=n_vax / n, ve=ve, ve_infectiousness=ve_infectiousness
+    )
+    if M_vax.ndim == 2:
+        eigen = ngm.linalg.dominant_eigen(M_vax)
+    else:
+        eigen = ngm.linalg.dominant_eigen_batch(M_vax)
 
     return {"M": M_vax, "Re": eigen.value, "infection_distribution": eigen.vector}
 
 
+def type_reproduction_numbers(M: np.ndarray) -> np.ndarray:
+    """
+    Type-reproduction number for each group
+
+    The type-reproduction number T_i is the number of infections in group i
+    caused, over all chains of transmission through the other groups, by one
+    infection in group i. Preventing a fraction greater than 1 - 1/T_i of
+    transmission into group i alone stops the outbreak. If T_i is infinite,
+    control targeted at group i alone cannot stop the outbreak.
+
+    T_i = e_i' M (I - (I - P_i) M)^-1 e_i, where P_i projects onto group i.
+    Since I - (I - P_i) M is a rank-one update of I - M, the Sherman-Morrison
+    formula gives T_i = 1 - 1 / [(I - M)^-1]_ii for all groups from a single
+    inverse. The formula applies only if the spectral radius of (I - P_i) M is
+    less than 1, which holds if and only if the inverse of I - (I - P_i) M,
+    also found by Sherman-Morrison, is non-negative. These inverses are checked
+    one group at a time, so memory grows with n^2 per matrix.
+
+    If M has an eigenvalue of exactly 1, then I - M is singular, and T_i is
+    instead found from the definition, with a spectral radius and a linear solve
+    for each group.
+
+    Args:
+        M (np.array): Next generation matrix, or matrices stacked along leading
+            axes
+
+    Returns:
+        np.ndarray: type-reproduction numbers, with shape `(..., n_groups)`
+    """
+    M = np.asarray(M, dtype=float)
+    assert M.ndim >= 2 and M.shape[-2] == M.shape[-1], "M must be square"
+    n_groups = M.shape[-1]
+    identity = np.identity(n_groups)
+
+    singular = np.linalg.slogdet(identity - M).sign == 0.0
+    B = np.linalg.inv(
+        np.where(singular[..., np.newaxis, np.newaxis], identity, identity - M)
+    )
+    B_ii = np.diagonal(B, axis1=-2, axis2=-1)
+
+    # (I - (I - P_i) M)^-1 = B - B e_i (e_i' M B) / B_ii, and M B = B - I.
+    # If B_ii = 0, then I - (I - P_i) M is singular, and the update is not finite.
+    rows = B - identity
+    tol = 1e-10 * np.abs(B).max(axis=(-2, -1))
+    controllable = np.empty(M.shape[:-1], dtype=bool)
+    inverse = np.empty_like(B)
+    for i in range(n_groups):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.multiply(
+                B[..., :, i, np.newaxis] / B_ii[..., i, np.newaxis, np.newaxis],
+                rows[..., np.newaxis, i, :],
+                out=inverse,
+            )
+        np.subtract(B, inverse, out=inverse)
+        # NaN entries, from B_ii = 0, are not non-negative
+        controllable[..., i] = (inverse >= -tol[..., np.newaxis, np.newaxis]).all(
+            axis=(-2, -1)
+        )
+
+    with np.errstate(divide="ignore"):
+        out = np.where(controllable, 1.0 - 1.0 / B_ii, np.inf)
+
+    out[singular] = _type_reproduction_direct(M[singular])
+    return out
+
+
+def _type_reproduction_direct(M: np.ndarray) -> np.ndarray:
+    """Type-reproduction numbers from the definition, for a stack of matrices"""
+    n_groups = M.shape[-1]
+    identity = np.identity(n_groups)
+
+    out = np.empty(M.shape[:-1])
+    for i in range(n_groups):
+        Q = M.copy()
+        Q[..., i, :] = 0.0
+        # a spectral radius within round-off of 1 also makes I - Q singular
+        controllable = np.abs(np.linalg.eigvals(Q)).max(axis=-1) < 1.0 - 1e-10
+
+        A = np.where(controllable[..., np.newaxis, np.newaxis], identity - Q, identity)
+        e_i = np.broadcast_to(identity[:, i, np.newaxis], M.shape[:-1] + (1,))
+        x = np.linalg.solve(A, e_i)[..., 0]
+        out[..., i] = np.where(
+            controllable, np.einsum("...j,...j->...", M[..., i, :], x), np.inf
+        )
+
+    return out
+
+
 def severity(
     eigenvalue: float, eigenvector: np.ndarray, p_severe: np.ndarray, G: int
 ) -> np.ndarray:
@@ -61,17 +169,61 @@ def severity(
     return (eigenvalue ** np.arange(G + 1)).sum() * eigenvector * p_severe
 
 
-def vaccinate_M(M: np.ndarray, p_vax: np.ndarray, ve: float) -> np.ndarray:
-    """Adjust a next generation matrix with vaccination"""
-    assert len(M.shape) == 2 and M.shape[0] == M.shape[1], "M must be square"
-    n_groups = M.shape[0]
-    assert len(p_vax) == n_groups, "Input dimensions must match"
-    assert (0 <= p_vax).all() and (p_vax <= 1.0).all(), (
+def vaccinate_M(
+    M: np.ndarray,
+    p_vax: np.ndarray,
+    ve: Union[float, np.ndarray],
+    ve_infectiousness: Union[float, np.ndarray] = 0.0,
+) -> np.ndarray:
+    """Adjust a next generation matrix with vaccination
+
+    Vaccine efficacy against infection (`ve`) scales row i, i.e., infections in
+    group i, by the fraction of group i that remains susceptible. Efficacy against
+    onward transmission (`ve_infectiousness`) scales column j by the mean
+    infectiousness of infections in group j, among which vaccinated people are
+    under-represented by their protection against infection.
+
+    Efficacies can be scalars, vary by group with shape `(n,)`, or vary by
+    product and group with shape `(n_products, n)`. With multiple products,
+    `p_vax` has shape `(..., n_products, n)`, and the coverage of all products
+    in each group cannot exceed 1.
+
+    Batches of coverage are broadcast against the matrix: if `p_vax` has shape
+    `(..., n)`, or `(..., n_products, n)`, then the result has shape
+    `(..., n, n)`, with one vaccinated matrix for each set of coverage.
+    """
+    M = np.asarray(M)
+    p_vax = np.asarray(p_vax)
+    ve_s = np.asarray(ve, dtype=float)
+    ve_i = np.asarray(ve_infectiousness, dtype=float)
+    assert M.ndim >= 2 and M.shape[-2] == M.shape[-1], "M must be square"
+    n_groups = M.shape[-1]
+    assert p_vax.ndim >= 1 and p_vax.shape[-1] == n_groups, (
+        "Input dimensions must match"
+    )
+    assert ve_s.ndim <= 2 and ve_i.ndim <= 2, "Efficacy must be by product and group"
+    assert ((0 <= ve_s) & (ve_s <= 1.0)).all() and ((0 <= ve_i) & (ve_i <= 1.0)).all()
+
+    if max(ve_s.ndim, ve_i.ndim) < 2:
+        # a single product
+        p_vax = p_vax[..., np.newaxis, :]
+    else:
+        assert p_vax.ndim >= 2, "Coverage must be by product and group"
+
+    total = p_vax.sum(axis=-2)
+    assert (0 <= p_vax).all() and (total <= 1.0 + 1e-12).all(), (
         "Vaccine coverage must be in [0, 1]"
     )
-    assert 0 <= ve <= 1.0
 
-    return (M.T * (1 - p_vax * ve)).T
+    # fraction of each group that is susceptible, and that is susceptible but
+    # would be less infectious once infected
+    susceptible = np.clip(1 - (p_vax * ve_s).sum(axis=-2), 0.0, None)
+    reduced = (p_vax * (1 - ve_s) * ve_i).sum(axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # a group with no susceptibles has no infections, so its column is moot
+        infectious = np.where(susceptible > 0, 1 - reduced / susceptible, 1.0)
+
+    return M * susceptible[..., :, np.newaxis] * infectious[..., np.newaxis, :]
 
 
 def distribute_vaccines(
@@ -128,7 +280,7 @@ def distribute_vaccines(
 
             n_vax += remaining_doses * np.array(remaining_proportions)
 
-    assert sum(n_vax) == V
+    assert np.isclose(sum(n_vax), V)
     assert len(n_vax) == n_groups
 
     return n_vax
@@ -7,71 +7,11 @@ import streamlit as st
 import streamlit.delta_generator
 
 import ngm
-
-
-def simulate_scenario(params, distributions_as_percents=False):
-    assert sum(params["pop_props"]) == 1.0
-
-    mult = 1.0
-    if distributions_as_percents:
-        mult = 100.0
-
-    # population sizes
-    N_i = params["n_total"] * np.array(params["pop_props"])
-
-    M_novax = np.array(params["M_novax"])
-    p_severe = np.array(params["p_severe"])
-
-    if "n_vax" in params:
-        n_vax = params["n_vax"]
-    else:
-        n_vax = ngm.distribute_vaccines(
-            params["n_vax_total"], N_i, strategy=params["vax_strategy"]
-        )
-
-    result = ngm.run_ngm(M_novax=M_novax, n=N_i, n_vax=n_vax, ve=params["ve"])
-
-    Re = result["Re"]
-    ifr = np.dot(result["infection_distribution"], p_severe)
-    fatalities_per_prior_infection = ngm.severity(
-        eigenvalue=Re,
-        eigenvector=result["infection_distribution"],
-        p_severe=p_severe,
-        G=1,
-    )
-    fatalities_after_G_generations = ngm.severity(
-        eigenvalue=Re,
-        eigenvector=result["infection_distribution"],
-        p_severe=p_severe,
-        G=params["G"],
-    )
-
-    infection_distribution_dict = {
-        f"infections_{group}": result["infection_distribution"][i] * mult
-        for i, group in enumerate(params["group_names"])
-    }
-
-    deaths_per_prior_infection_dict = {
-        f"deaths_per_prior_infection_{group}": fatalities_per_prior_infection[i]
-        for i, group in enumerate(params["group_names"])
-    }
-
-    deaths_after_G_generations_dict = {
-        f"deaths_after_G_generations_{group}": fatalities_after_G_generations[i]
-        for i, group in enumerate(params["group_names"])
-    }
-
-    # Combine all dictionaries into results_dict
-    results_dict = {
-        "Re": Re,
-        "ifr": ifr,
-        "deaths_per_prior_infection": fatalities_per_prior_infection.sum(),
-        "deaths_after_G_generations": fatalities_after_G_generations.sum(),
-        **infection_distribution_dict,
-        **deaths_per_prior_infection_dict,
-        **deaths_after_G_generations_dict,
-    }
-    return pl.DataFrame(results_dict)
+import ngm.linalg
+import ngm.optimize
+import ngm.renewal
+import ngm.sweep
+from ngm.scenario import simulate_scenario
 
 
 def extract_vector(
@@ -80,12 +20,13 @@ def extract_vector(
     index_name: str,
     sigdigs,
     groups=["core", "children", "adults"],
+    total=True,
 ):
     assert df.shape[0] == 1
     cols = [prefix + grp for grp in groups]
     vec = (
         df.with_columns(
-            total=pl.sum_horizontal(cols),
+            total=pl.sum_horizontal(cols) if total else pl.lit(None, pl.Float64),
         )
         .select(pl.col(col).round_sig_figs(sigdigs) for col in ["total", *cols])
         .with_columns(
@@ -106,11 +47,13 @@ def summarize_scenario(
         "infections_",
         "deaths_per_prior_infection_",
         "deaths_after_G_generations_",
+        "type_reproduction_",
     ],
     display_names=[
         "Percent of infections",
         "Severe infections per prior infection",
         "Severe infections after G generations",
+        "Type reproduction number",
     ],
 ):
     p_vax = params["n_vax"] / (params["n_total"] * params["pop_props"])
@@ -135,7 +78,15 @@ def summarize_scenario(
 
     res = pl.concat(
         [
-            extract_vector(disp, result, disp_name, sigdigs, groups=groups)
+            extract_vector(
+                disp,
+                result,
+                disp_name,
+                sigdigs,
+                groups=groups,
+                # type-reproduction numbers don't add up across groups
+                total=disp != "type_reproduction_",
+            )
             for disp, disp_name in zip(display, display_names)
         ]
     )
@@ -160,6 +111,12 @@ def summarize_scenario(
     re_help = "The effective reproductive number accounting for the specified administration of vaccines in this scenario."
     c.subheader(f"R-effective: {result['Re'].round_sig_figs(sigdigs)[0]}", help=re_help)
 
+    convergence_help = "How many generations of infection it takes, starting from any distribution of infections, for the distribution of infections across groups to be within 1% of the stationary distribution shown in the table above. This is set by the spectral gap, i.e., how much smaller the second-largest eigenvalue of the next-generation matrix is than R-effective."
+    c.subheader(
+        f"Generations to stationary distribution: {result['generations_to_stationary'][0]:.0f}",
+        help=convergence_help,
+    )
+
     ifr_help = 'The probability that a random infection will result in the severe outcome of interest, e.g. death, accounting for the specified administration of vaccines in this scenario. Here "random" means drawing uniformly across all infections, so the probability that one draws an infection in any class is given by the distribution specified in the summary table above.'
     c.subheader(
         f"Severe infection ratio: {result['ifr'].round_sig_figs(sigdigs)[0]}",
@@ -202,6 +159,145 @@ def summarize_scenario(
 
     c.altair_chart(chart, use_container_width=True)
 
+    if params.get("generation_interval") is not None:
+        c.subheader(
+            "Daily infections",
+            help="This plot shows how many infections (in total across groups) there will be, both severe and otherwise, on each day after the index infection, assuming the specified generation interval distribution. All generations of infection that occur within the horizon are included.",
+        )
+
+        daily = ngm.renewal.daily_incidence(
+            M=m_vax,
+            generation_interval=params["generation_interval"],
+            T=params["T"],
+            p_severe=params["p_severe"],
+        )
+        calendar_df = pl.DataFrame(
+            {
+                "Day": np.arange(params["T"]),
+                "Severe Infections": daily["severe"].sum(axis=1),
+                "Non-Severe Infections": (daily["incidence"] - daily["severe"]).sum(
+                    axis=1
+                ),
+            }
+        ).unpivot(index="Day", variable_name="Infection Type", value_name="Count")
+
+        chart = (
+            alt.Chart(calendar_df)
+            .mark_area()
+            .encode(x="Day:Q", y="Count:Q", color="Infection Type:N")
+            .properties(title="")
+        )
+
+        c.altair_chart(chart, use_container_width=True)
+
+
+def plot_frontier(c: streamlit.delta_generator.DeltaGenerator, params: dict):
+    N_i = params["n_total"] * np.array(params["pop_props"])
+    frontier = ngm.optimize.pareto_frontier(
+        M_novax=params["M_novax"],
+        N_i=N_i,
+        ve=params["ve"],
+        V=params["n_vax"].sum(),
+        p_severe=params["p_severe"],
+        G=params["G"],
+        group_names=params["group_names"],
+    )
+
+    c.header("*Allocation trade-offs*")
+    c.subheader(
+        "Re versus severe infections after G generations",
+        help="Each point is an allocation of the total number of doses in the vaccination scenario that cannot reduce Re without increasing severe infections, or vice versa. Hover over a point to see the allocation.",
+    )
+
+    vax_cols = [f"n_vax_{grp}" for grp in params["group_names"]]
+    chart = (
+        alt.Chart(frontier)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("Re:Q", scale=alt.Scale(zero=False)),
+            y=alt.Y("severe:Q", title="Severe infections", scale=alt.Scale(zero=False)),
+            tooltip=[
+                "Re:Q",
+                "severe:Q",
+                *[alt.Tooltip(f"{col}:Q", format=",.0f") for col in vax_cols],
+            ],
+        )
+        .interactive()
+    )
+
+    c.altair_chart(chart, use_container_width=True)
+
+
+def start_sweep(scenarios: list[dict], key) -> ngm.sweep.SweepWorker:
+    """Background sweep for these scenarios, cancelling any sweep of other inputs"""
+    key = (key, len(scenarios))
+    if "sweep" in st.session_state:
+        old_key, worker = st.session_state["sweep"]
+        if old_key == key:
+            return worker
+        worker.cancel()
+
+    worker = ngm.sweep.SweepWorker(scenarios).start()
+    st.session_state["sweep"] = (key, worker)
+    return worker
+
+
+def cancel_sweep():
+    if "sweep" in st.session_state:
+        _, worker = st.session_state.pop("sweep")
+        worker.cancel()
+
+
+def plot_sweep(worker: ngm.sweep.SweepWorker, x_title: str, x_values: np.ndarray):
+    st.header("*Sweep*")
+    st.subheader(
+        f"Outcomes by {x_title.lower()}",
+        help="The vaccination scenario, with all inputs fixed except the one being swept. Results are shown as they are computed.",
+    )
+    if worker.done:
+        _render_sweep(worker, x_title, x_values)
+    else:
+        _render_sweep_live(worker, x_title, x_values)
+
+
+@st.fragment(run_every=0.5)
+def _render_sweep_live(
+    worker: ngm.sweep.SweepWorker, x_title: str, x_values: np.ndarray
+):
+    _render_sweep(worker, x_title, x_values)
+    if worker.done:
+        # rerun once more, to stop polling
+        st.rerun()
+
+
+def _render_sweep(worker: ngm.sweep.SweepWorker, x_title: str, x_values: np.ndarray):
+    progress = worker.progress()
+    st.progress(progress, text=f"{progress:.0%} of {len(x_values)} points computed")
+    if worker.error is not None:
+        message = str(worker.error) or type(worker.error).__name__
+        st.error(f"Sweep failed at some points, which are not shown: {message}")
+
+    results = worker.results()
+    if results.height == 0:
+        return
+
+    sweep_df = results.select(
+        pl.Series(x_title, x_values[: results.height]),
+        "Re",
+        pl.col("deaths_after_G_generations").alias(
+            "Severe infections after G generations"
+        ),
+    )
+    base = alt.Chart(sweep_df).encode(
+        x=alt.X(f"{x_title}:Q", scale=alt.Scale(domain=[x_values[0], x_values[-1]]))
+    )
+    chart = alt.hconcat(
+        base.mark_line().encode(y="Re:Q"),
+        base.mark_line().encode(y="Severe infections after G generations:Q"),
+    )
+
+    st.altair_chart(chart, use_container_width=True)
+
 
 def app():
     st.info(
@@ -279,6 +375,68 @@ def app():
                 step=1,
                 help="Values are reported only to this many significant figures.",
             )
+            show_frontier = st.checkbox(
+                "Show allocation trade-offs",
+                value=False,
+                help="Plot the trade-off between Re and severe infections across all allocations of the total number of doses.",
+            )
+            show_calendar = st.checkbox(
+                "Show daily infections",
+                value=False,
+                help="Plot infections by day, rather than by generation, using a gamma-distributed generation interval.",
+            )
+            if show_calendar:
+                gi_mean = st.number_input(
+                    "Mean generation interval (days)",
+                    min_value=1.0,
+                    value=5.0,
+                    step=0.5,
+                )
+                gi_sd = st.number_input(
+                    "Generation interval standard deviation (days)",
+                    min_value=0.5,
+                    value=2.0,
+                    step=0.5,
+                )
+                T = st.slider(
+                    "Days",
+                    7,
+                    365,
+                    value=60,
+                    step=1,
+                    help="Daily infections are shown for this many days after the index infection.",
+                )
+            show_sweep = st.checkbox(
+                "Show sweep",
+                value=False,
+                help="Run the vaccination scenario over a grid of total doses or vaccine efficacies in the background, and plot the results as they are computed.",
+            )
+            if show_sweep:
+                sweep_over = st.selectbox(
+                    "Sweep over", ["Total doses", "Vaccine efficacy"]
+                )
+                strategies = {
+                    "even": "Distribute by population size",
+                    **{
+                        str(i): f"Prioritize {grp}"
+                        for i, grp in enumerate(params["Group name"])
+                    },
+                }
+                sweep_strategy = st.selectbox(
+                    "Dose allocation",
+                    list(strategies.keys()),
+                    format_func=strategies.get,
+                    disabled=sweep_over != "Total doses",
+                    help="How doses are allocated when sweeping over total doses. Groups that are prioritized are filled first, and remaining doses are distributed by population size.",
+                )
+                sweep_points = st.slider(
+                    "Sweep points",
+                    10,
+                    5000,
+                    value=200,
+                    step=10,
+                    help="Number of values in the sweep.",
+                )
 
         st.caption(f"App version: {importlib.metadata.version('ngm')}")
 
@@ -299,6 +457,11 @@ def app():
         "ve": VE,
         "G": G,
     }
+    if show_calendar:
+        scenario["generation_interval"] = ngm.renewal.discretize_gamma(
+            mean=gi_mean, sd=gi_sd, max_days=int(gi_mean + 5 * gi_sd) + 1
+        )
+        scenario["T"] = T
 
     counterfactual = scenario.copy()
     counterfactual["scenario_title"] = "Scenario: Counterfactual (no vaccination)"
@@ -316,6 +479,7 @@ def app():
         "- Percent of infections: The percent of all infections which are in the given group.\n"
         "- Severe infections per prior infection: If there is one infection, how many severe infections in each group will there be in the next generation of infections?\n"
         "- Severe infections after G generations: Starting with one index infection, how many severe infections will there have been, cumulatively, in each group after G generations of infection? Note that the index infection is marginalized over the the distribution on infections from the table above.\n"
+        "- Type reproduction number: How many infections in the given group will one infection in that group cause, through all chains of transmission? Control measures that prevent more than 1 - 1/T of infections in this group alone will stop the outbreak. If this is infinite, controlling this group alone cannot stop the outbreak.\n"
     )
     st.write(summary_help)
 
@@ -324,6 +488,34 @@ def app():
     for s in scenarios:
         summarize_scenario(c=c, params=s, sigdigs=sigdigs, groups=params["Group name"])
 
+    if show_frontier:
+        plot_frontier(c=c, params=scenario)
+
+    if show_sweep:
+        if sweep_over == "Total doses":
+            x_values = np.linspace(0.0, N.sum(), sweep_points)
+            base = {k: v for k, v in scenario.items() if k != "n_vax"}
+            sweep_scenarios = [
+                {**base, "n_vax_total": x, "vax_strategy": sweep_strategy}
+                for x in x_values
+            ]
+        else:
+            x_values = np.linspace(0.0, 1.0, sweep_points)
+            sweep_scenarios = [{**scenario, "ve": x} for x in x_values]
+
+        worker = start_sweep(
+            sweep_scenarios,
+            key=(
+                ngm.sweep.scenario_key(scenario),
+                sweep_over,
+                # the allocation only applies to sweeps over doses
+                sweep_strategy if sweep_over == "Total doses" else None,
+            ),
+        )
+        plot_sweep(worker, x_title=sweep_over, x_values=x_values)
+    else:
+        cancel_sweep()
+
 
 if __name__ == "__main__":
     app()
@@ -5,6 +5,7 @@ import numpy as np
 import numpy.linalg as la
 
 Eigen = namedtuple("Eigen", ["value", "vector"])
+Convergence = namedtuple("Convergence", ["value", "ratio", "generations"])
 
 
 def is_irreducible(X: np.ndarray) -> bool:
@@ -100,6 +101,241 @@ def dominant_eigen(X: np.ndarray) -> Eigen:
     return eigen
 
 
+def dominant_eigen_batch(X: np.ndarray, atol: float = 1e-10) -> Eigen:
+    """Dominant eigenvalues and eigenvectors of a stack of matrices
+
+    Like `dominant_eigen`, but for matrices stacked along leading axes, with a
+    single call to the eigen solver. For a non-negative matrix, the dominant
+    eigenvalue is the one with the largest real part.
+
+    Args:
+        X (np.array): matrices, with shape `(..., n, n)`
+        atol (float): tolerance for imaginary parts and negative entries in the
+            eigenvector, which are due to round-off
+
+    Returns:
+        namedtuple: with entries `value`, with shape `(...)`, and `vector`, with
+            shape `(..., n)`, each eigenvector being a probability vector
+    """
+    if not (X >= 0.0).all():
+        raise RuntimeError("Matrix must be non-negative")
+
+    assert X.ndim >= 2 and X.shape[-2] == X.shape[-1], "Matrix must be square"
+
+    eigen_all = la.eig(X)
+    idx = np.argmax(eigen_all.eigenvalues.real, axis=-1)
+    value = np.take_along_axis(eigen_all.eigenvalues, idx[..., np.newaxis], -1)
+    vector = np.take_along_axis(
+        eigen_all.eigenvectors, idx[..., np.newaxis, np.newaxis], -1
+    )
+    value, vector = value[..., 0], vector[..., 0]
+
+    if (np.abs(np.imag(value)) > atol).any() or (np.abs(np.imag(vector)) > atol).any():
+        raise RuntimeError("Complex-valued eigenvalue or eigenvector")
+
+    value, vector = np.real(value), np.real(vector)
+    vector = vector / vector.sum(axis=-1, keepdims=True)
+
+    if (value <= 0.0).any():
+        raise RuntimeError("Negative eigenvalue")
+    elif (vector < -atol).any():
+        raise RuntimeError("Eigenvector has mixed signs")
+
+    return Eigen(value=value, vector=vector)
+
+
+# in `top_eigen`, matrices with at most DIRECT_MAX_N rows, for which a full
+# eigendecomposition is cheaper than a few iterations, and matrices whose
+# residuals shrink by less than STALL_FACTOR over STALL_WINDOW iterations, get
+# a full eigendecomposition instead
+DIRECT_MAX_N = 128
+STALL_WINDOW = 5
+STALL_FACTOR = 0.5
+
+
+def top_eigen(
+    X: np.ndarray,
+    k: int = 2,
+    oversample: int = 4,
+    tol: float = 1e-10,
+    max_iter: int = 1000,
+) -> Eigen:
+    """Leading eigenvalues and eigenvectors of a matrix, by subspace iteration
+
+    Iterates a block of k + `oversample` vectors and extracts Ritz pairs from
+    the block, so each iteration costs a product of X with k + `oversample`
+    vectors rather than a full eigendecomposition. Convergence is fast when
+    the (k + `oversample` + 1)-th eigenvalue is much smaller than the k-th in
+    absolute value. Matrices stacked along leading axes are iterated together.
+
+    Args:
+        X (np.array): matrix, or matrices with shape `(..., n, n)`
+        k (int): number of eigenpairs
+        oversample (int): extra vectors in the block, which speed convergence
+            and separate eigenvalues of equal modulus (e.g., complex pairs)
+        tol (float): convergence tolerance on the residual of each eigenpair,
+            relative to the largest eigenvalue
+        max_iter (int): maximum number of iterations, after which any matrices
+            that have not converged get a full eigendecomposition. Matrices whose
+            residuals stop shrinking, i.e., without a gap in the spectrum to
+            drive convergence, get one sooner, and small matrices get one
+            without iterating.
+
+    Returns:
+        namedtuple: with entries `value`, with shape `(..., k)`, in decreasing
+            order of absolute value, and `vector`, with shape `(..., n, k)`,
+            where the i-th column is the (L2-normed) eigenvector for the i-th
+            eigenvalue. Both are complex-typed.
+    """
+    n = X.shape[-1]
+    assert X.ndim >= 2 and X.shape[-2] == n, "Matrix must be square"
+    assert 1 <= k <= n
+    p = min(k + oversample, n)
+    if n <= DIRECT_MAX_N:
+        return _top_eigen_full(X, k)
+
+    # fixed starting block, so results are reproducible
+    Q = np.random.default_rng(0).uniform(size=(n, p))
+    Q = np.broadcast_to(la.qr(Q).Q, X.shape[:-2] + (n, p))
+
+    # relative residuals, every STALL_WINDOW iterations from the first
+    previous = np.full(X.shape[:-2], np.inf)
+    stalled = np.zeros(X.shape[:-2], dtype=bool)
+    for i in range(max_iter):
+        Z = X @ Q
+        # Ritz values and vectors from the projection of X onto the block
+        H = np.swapaxes(Q, -2, -1) @ Z
+        eigen_H = la.eig(H)
+        order = np.argsort(-np.abs(eigen_H.eigenvalues), axis=-1)[..., :k]
+        value = np.take_along_axis(eigen_H.eigenvalues, order, -1)
+        Y = np.take_along_axis(eigen_H.eigenvectors, order[..., np.newaxis, :], -1)
+        vector = Q @ Y
+
+        residual = la.norm(Z @ Y - vector * value[..., np.newaxis, :], axis=-2)
+        scale = np.maximum(np.abs(value[..., :1]), np.finfo(float).tiny)
+        converged = (residual <= tol * scale).all(axis=-1)
+        if i % STALL_WINDOW == 0:
+            relative = (residual / scale).max(axis=-1)
+            stalled |= relative > STALL_FACTOR * previous
+            previous = relative
+        if (converged | stalled).all():
+            break
+
+        Q = la.qr(Z).Q
+
+    value = value.astype(complex)
+    vector = vector.astype(complex)
+    if not converged.all():
+        # fall back to a full decomposition, only for the matrices that need it
+        full = _top_eigen_full(X[~converged], k)
+        value[~converged] = full.value
+        vector[~converged] = full.vector
+
+    return Eigen(value=value, vector=vector)
+
+
+def _top_eigen_full(X: np.ndarray, k: int) -> Eigen:
+    """Like `top_eigen`, but from a full eigendecomposition"""
+    eigen_all = la.eig(X)
+    order = np.argsort(-np.abs(eigen_all.eigenvalues), axis=-1)[..., :k]
+    value = np.take_along_axis(eigen_all.eigenvalues, order, -1)
+    vector = np.take_along_axis(eigen_all.eigenvectors, order[..., np.newaxis, :], -1)
+    return Eigen(value=value.astype(complex), vector=vector.astype(complex))
+
+
+def convergence_diagnostics(X: np.ndarray, eps: float = 0.01, **kwargs) -> Convergence:
+    """How quickly infections approach the stationary distribution
+
+    The contributions of the other eigenvectors shrink, relative to the dominant
+    eigenvector, by a factor |lambda_2| / lambda_1 per generation, where
+    lambda_2 is the eigenvalue with the second-largest absolute value. The
+    spectral gap is 1 minus this ratio.
+
+    Args:
+        X (np.array): non-negative matrix, or matrices with shape `(..., n, n)`
+        eps (float): relative size of the other contributions when the
+            distribution of infections is considered to have converged
+        **kwargs: passed to `top_eigen`
+
+    Returns:
+        namedtuple: with entries `value`, the dominant eigenvalue; `ratio`,
+            |lambda_2| / lambda_1; and `generations`, the number of generations
+            until the ratio raised to that power falls below `eps`. This is
+            infinite if some other eigenvalue is as large as the dominant one in
+            absolute value.
+    """
+    if not (X >= 0.0).all():
+        raise RuntimeError("Matrix must be non-negative")
+
+    assert 0.0 < eps < 1.0
+    if X.shape[-1] == 1:
+        value = X[..., 0, 0]
+        return Convergence(
+            value=value, ratio=np.zeros_like(value), generations=np.ones_like(value)
+        )
+
+    eigen = top_eigen(X, k=2, **kwargs)
+    value = np.abs(eigen.value[..., 0])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(value > 0.0, np.abs(eigen.value[..., 1]) / value, 1.0)
+        generations = np.where(
+            ratio >= 1.0 - 1e-12,
+            np.inf,
+            np.where(ratio > 0.0, np.ceil(np.log(eps) / np.log(ratio)), 1.0),
+        )
+
+    # unwrap 0-d arrays for a single matrix
+    return Convergence(value=value, ratio=ratio[()], generations=generations[()])
+
+
+def power_eigen(
+    X: np.ndarray,
+    x0: Optional[np.ndarray] = None,
+    tol: float = 1e-12,
+    max_iter: int = 10_000,
+) -> Eigen:
+    """Dominant eigenvalue and eigenvector of a matrix, by power iteration
+
+    Power iteration on the shifted matrix I + X, which has the same dominant
+    eigenvector as X but no other eigenvalues of the same modulus. Starting
+    from the eigenvector of a nearby matrix (e.g., the previous step of a
+    solver) usually converges in a handful of matrix-vector products.
+
+    Falls back to `dominant_eigen` if the iteration does not converge.
+
+    Args:
+        X (np.array): non-negative matrix
+        x0 (np.array, optional): starting vector. Defaults to uniform.
+        tol (float): convergence tolerance on the L1 change in the eigenvector
+        max_iter (int): maximum number of iterations
+
+    Returns:
+        namedtuple: with entries `value` and `vector`
+    """
+    if not (X >= 0.0).all():
+        raise RuntimeError("Matrix must be non-negative")
+
+    n = _square_n(X)
+
+    if x0 is None:
+        x = np.full(n, 1.0 / n)
+    else:
+        assert len(x0) == n
+        assert _is_nonnegative_vector(x0) and np.abs(x0).sum() > 0.0
+        x = np.abs(x0) / np.abs(x0).sum()
+
+    for _ in range(max_iter):
+        y = X @ x + x
+        norm = y.sum()
+        y = y / norm
+        if np.abs(y - x).sum() < tol:
+            return Eigen(value=norm - 1.0, vector=y)
+
+        x = y
+
+    return dominant_eigen(X)
+
+
 def _ensure_real_eigen(e: Eigen) -> Eigen:
     """Verify that eigenvalue/vector are real-valued. Then ensure that they
     are also real-typed."""
@@ -0,0 +1,321 @@
+import bisect
+from typing import Optional, Sequence, Union
+
+import numpy as np
+import polars as pl
+
+import ngm
+import ngm.linalg
+
+
+def dose_threshold(
+    M_novax: np.ndarray,
+    N_i: np.ndarray,
+    ve: float,
+    strategy: Union[str, Sequence[str]] = "even",
+    target_Re: Union[float, Sequence[float]] = 1.0,
+    tol: float = 1.0,
+) -> Union[float, np.ndarray]:
+    """
+    Minimum number of vaccine doses needed to bring Re below a target
+
+    Doses are distributed according to `distribute_vaccines`, so for any
+    strategy, Re is non-increasing in the number of doses. The threshold is
+    bracketed between zero doses and vaccinating the whole population, and
+    then found by bisection. Each eigen solve is warm-started from the
+    eigenvector of the previous one.
+
+    When solving for multiple targets, evaluations are shared: every
+    evaluated budget narrows the bracket for every target, since a budget
+    with Re below a target is also below all larger targets.
+
+    Args:
+        M_novax: Next Generation Matrix in the absence of administering any vaccines
+        N_i (np.array): Population sizes for each group
+        ve (float): Vaccine efficacy
+        strategy (str or list of str): Strategy or strategies, as in `distribute_vaccines`
+        target_Re (float or array): Target value(s) of Re
+        tol (float): Width, in doses, of the final bracket
+
+    Returns:
+        float or np.ndarray: minimal number of doses (to within `tol`) so that
+            Re is below the target, or `nan` if vaccinating the entire
+            population does not achieve the target. If multiple strategies
+            and/or targets are given, the array has shape
+            `(n_strategies, n_targets)`, with scalar inputs dropped.
+    """
+    assert tol > 0.0
+    strategies = np.array(strategy, dtype=str)
+    targets = np.array(target_Re, dtype=float)
+
+    out = np.array(
+        [
+            _dose_threshold_one_strategy(
+                M_novax=M_novax,
+                N_i=N_i,
+                ve=ve,
+                strategy=str(s),
+                targets=targets.reshape(-1),
+                tol=tol,
+            )
+            for s in strategies.reshape(-1)
+        ]
+    ).reshape(strategies.shape + targets.shape)
+
+    if out.ndim == 0:
+        return float(out)
+    else:
+        return out
+
+
+def _dose_threshold_one_strategy(
+    M_novax: np.ndarray,
+    N_i: np.ndarray,
+    ve: float,
+    strategy: str,
+    targets: np.ndarray,
+    tol: float,
+) -> np.ndarray:
+    """Bisection for all targets, sharing evaluations of Re"""
+    # budgets evaluated so far, in increasing order, with their values of Re
+    doses = []
+    Re = []
+    last_vector = None
+
+    def evaluate(V: float) -> float:
+        nonlocal last_vector
+        n_vax = ngm.distribute_vaccines(V, N_i, strategy=strategy)
+        # guard against round-off when the whole population is vaccinated
+        p_vax = np.minimum(n_vax / N_i, 1.0)
+        M_vax = ngm.vaccinate_M(M=M_novax, p_vax=p_vax, ve=ve)
+        eigen = ngm.linalg.power_eigen(M_vax, x0=last_vector)
+        last_vector = eigen.vector
+
+        i = bisect.bisect(doses, V)
+        doses.insert(i, V)
+        Re.insert(i, eigen.value)
+        return eigen.value
+
+    V_max = float(np.sum(N_i))
+    evaluate(0.0)
+    evaluate(V_max)
+
+    out = np.full(len(targets), np.nan)
+    # solve from the largest target down, so each warm start is from a nearby budget
+    for j in np.argsort(-targets):
+        threshold = _bisect_threshold(doses, Re, targets[j], evaluate, tol)
+        if threshold is not None:
+            out[j] = threshold
+
+    return out
+
+
+def _bisect_threshold(
+    doses: list, Re: list, target: float, evaluate, tol: float
+) -> Optional[float]:
+    """Bisect for the smallest budget with Re below target, starting from the
+    tightest bracket among the budgets already evaluated"""
+    if Re[0] < target:
+        return doses[0]
+    elif Re[-1] >= target:
+        return None
+
+    # Re is non-increasing, so the first budget below target is the upper bracket
+    hi_idx = next(i for i, r in enumerate(Re) if r < target)
+    lo, hi = doses[hi_idx - 1], doses[hi_idx]
+
+    while hi - lo > tol:
+        mid = 0.5 * (lo + hi)
+        if evaluate(mid) < target:
+            hi = mid
+        else:
+            lo = mid
+
+    return hi
+
+
+def pareto_frontier(
+    M_novax: np.ndarray,
+    N_i: np.ndarray,
+    ve: float,
+    V: float,
+    p_severe: np.ndarray,
+    G: int,
+    n_weights: int = 21,
+    group_names: Optional[Sequence[str]] = None,
+    tol: float = 1e-6,
+    max_iter: int = 500,
+) -> pl.DataFrame:
+    """
+    Pareto frontier of Re versus severe infections across vaccine allocations
+
+    For each weight w on a grid from 0 to 1, minimize the scalarized objective
+
+        w * Re / Re_even + (1 - w) * severe / severe_even
+
+    over all allocations of `V` doses, where `severe` is the cumulative number of
+    severe infections after `G` generations (as in `severity`) and the `_even`
+    values are for the "even" strategy. Each minimization is by projected gradient
+    descent, with analytic gradients from the eigenvalue and eigenvector
+    derivatives, and is warm-started from the optimum for the previous weight.
+
+    Scalarization only finds points on the convex hull of the frontier.
+
+    Args:
+        M_novax: Next Generation Matrix in the absence of administering any vaccines
+        N_i (np.array): Population sizes for each group
+        ve (float): Vaccine efficacy
+        V (float): Number of vaccine doses
+        p_severe (np.array): Probability of severe outcome in each group
+        G (int): Number of generations of infections which have occurred.
+        n_weights (int): Number of weights in the grid
+        group_names (list of str, optional): Names used in the allocation columns.
+            Defaults to group indices.
+        tol (float): Convergence tolerance, as a fraction of `V`, on the change in
+            allocation between iterations
+        max_iter (int): Maximum number of iterations per weight
+
+    Returns:
+        pl.DataFrame: non-dominated allocations, sorted by Re, with columns
+            `weight`, `Re`, `severe`, and `n_vax_{group}` for each group
+    """
+    N_i = np.asarray(N_i, dtype=float)
+    p_severe = np.asarray(p_severe, dtype=float)
+    assert 0.0 <= V <= N_i.sum(), "Can't vaccinate more people than there are"
+    assert len(p_severe) == len(N_i)
+    if group_names is None:
+        group_names = [str(i) for i in range(len(N_i))]
+
+    objective = _AllocationObjective(
+        M_novax=M_novax, N_i=N_i, ve=ve, p_severe=p_severe, G=G
+    )
+
+    # scale the objectives by their values under an even allocation
+    x = ngm.distribute_vaccines(V, N_i, strategy="even")
+    Re_ref, severe_ref, _, _ = objective(x)
+
+    rows = []
+    for w in np.linspace(0.0, 1.0, n_weights):
+        scale = np.array([w / Re_ref, (1.0 - w) / severe_ref])
+        x = _minimize_allocation(
+            objective, scale, x, N_i, V, tol=tol, max_iter=max_iter
+        )
+        Re, severe, _, _ = objective(x)
+        rows.append((w, Re, severe, x))
+
+    rows = _nondominated(rows)
+
+    return pl.DataFrame(
+        {
+            "weight": [r[0] for r in rows],
+            "Re": [r[1] for r in rows],
+            "severe": [r[2] for r in rows],
+            **{
+                f"n_vax_{grp}": [r[3][i] for r in rows]
+                for i, grp in enumerate(group_names)
+            },
+        }
+    )
+
+
+class _AllocationObjective:
+    """Re and severe infections, and their gradients, as functions of the
+    allocation of doses. Each eigen solve is warm-started from the last."""
+
+    def __init__(self, M_novax, N_i, ve, p_severe, G):
+        self.M_novax = M_novax
+        self.N_i = N_i
+        self.ve = ve
+        self.p_severe = p_severe
+        self.G = G
+        self.vector = None
+
+    def __call__(self, n_vax: np.ndarray):
+        n = len(self.N_i)
+        p_vax = np.clip(n_vax / self.N_i, 0.0, 1.0)
+        M_vax = ngm.vaccinate_M(M=self.M_novax, p_vax=p_vax, ve=self.ve)
+        eigen = ngm.linalg.power_eigen(M_vax, x0=self.vector)
+        self.vector = eigen.vector
+        Re, v = eigen.value, eigen.vector
+
+        # derivatives of (v, Re) with respect to each n_vax[i], from differentiating
+        # M_vax v = Re v subject to sum(v) = 1, all in a single bordered solve
+        bordered = np.zeros((n + 1, n + 1))
+        bordered[:n, :n] = M_vax - Re * np.identity(n)
+        bordered[:n, n] = -v
+        bordered[n, :n] = 1.0
+        rhs = np.zeros((n + 1, n))
+        rhs[:n] = np.diag(self.ve / self.N_i * (self.M_novax @ v))
+        d = np.linalg.solve(bordered, rhs)
+        dv, dRe = d[:n], d[n]
+
+        gens = np.arange(self.G + 1)
+        total = (Re**gens).sum()
+        dtotal = (gens[1:] * Re ** (gens[1:] - 1)).sum()
+        ifr = np.dot(v, self.p_severe)
+        severe = total * ifr
+        dsevere = dtotal * dRe * ifr + total * (self.p_severe @ dv)
+
+        return Re, severe, dRe, dsevere
+
+
+def _minimize_allocation(objective, scale, x, N_i, V, tol, max_iter) -> np.ndarray:
+    """Projected gradient descent with backtracking on the scaled objectives"""
+
+    # with no doses, the only allocation is none
+    if V == 0:
+        return np.zeros_like(x)
+
+    def f_and_grad(x):
+        Re, severe, dRe, dsevere = objective(x)
+        return scale[0] * Re + scale[1] * severe, scale[0] * dRe + scale[1] * dsevere
+
+    f, grad = f_and_grad(x)
+    step = V / max(np.abs(grad).sum(), np.finfo(float).tiny)
+
+    for _ in range(max_iter):
+        while True:
+            x_new = _project_capped_simplex(x - step * grad, N_i, V)
+            f_new, grad_new = f_and_grad(x_new)
+            dx = x_new - x
+            if f_new <= f + grad @ dx + (dx @ dx) / (2.0 * step) or step < 1e-12:
+                break
+            step /= 2.0
+
+        converged = np.abs(dx).sum() <= tol * max(V, 1.0)
+        x, f, grad = x_new, f_new, grad_new
+        step *= 2.0
+        if converged:
+            break
+
+    return x
+
+
+def _project_capped_simplex(
+    y: np.ndarray, upper: np.ndarray, total: float
+) -> np.ndarray:
+    """Euclidean projection onto {x : 0 <= x <= upper, sum(x) = total}"""
+    # the projection is clip(y - tau, 0, upper) for the tau that meets the total
+    lo, hi = np.min(y - upper), np.max(y)
+    for _ in range(100):
+        tau = 0.5 * (lo + hi)
+        if np.clip(y - tau, 0.0, upper).sum() > total:
+            lo = tau
+        else:
+            hi = tau
+
+    x = np.clip(y - 0.5 * (lo + hi), 0.0, upper)
+    # put any remaining round-off into the group with the most room
+    x[np.argmax(upper - x)] += total - x.sum()
+    return np.clip(x, 0.0, upper)
+
+
+def _nondominated(rows: list) -> list:
+    """Drop (weight, Re, severe, x) rows that are dominated in (Re, severe)"""
+    rows = sorted(rows, key=lambda r: (r[1], r[2]))
+    out = []
+    for r in rows:
+        if not out or r[2] < out[-1][2]:
+            out.append(r)
+
+    return out
@@ -0,0 +1,176 @@
+import math
+from typing import Any, Optional
+
+import numpy as np
+
+import ngm.linalg
+
+# relative size of wrapped-around values in `daily_incidence`
+TILT_DECAY = 1e-12
+
+
+def daily_incidence(
+    M: np.ndarray,
+    generation_interval: np.ndarray,
+    T: int,
+    p_severe: Optional[np.ndarray] = None,
+    x0: Optional[np.ndarray] = None,
+    G: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Daily infections in each group, from a next generation matrix and a
+    generation interval distribution
+
+    Solves the multi-type renewal equation
+
+        I(t) = sum_s w(s) M I(t - s),  I(0) = x0
+
+    where w is the generation interval distribution. With generating functions,
+    the solution is I(z) = (I - w(z) M)^-1 x0, or, keeping only the first G
+    generations, sum_k (w(z) M)^k x0. This is evaluated at the frequencies of a
+    discrete Fourier transform, with one n x n solve per frequency, and inverted
+    with an FFT, for O(T log T) cost in the number of days.
+
+    When all generations are included, the transform is taken along a circle of
+    radius r inside the singularity of I(z), i.e., of the exponentially tilted
+    incidence I(t) r^t, which decays along the transform length. This prevents
+    the circular wrap-around of a growing epidemic and keeps the tilted values
+    within floating point range. With finitely many generations, the transform
+    instead covers every day on which they can occur.
+
+    Args:
+        M (np.array): Next generation matrix, e.g., `run_ngm()["M"]`. Matrices
+            stacked along leading axes are treated as separate scenarios.
+        generation_interval (np.array): Probability that the generation interval
+            is 0, 1, 2, ... days
+        T (int): Number of days, including day 0 of the index infection
+        p_severe (np.array, optional): Probability of severe outcome in each group
+        x0 (np.array, optional): Infections on day 0. Defaults to a single index
+            infection, distributed according to the dominant eigenvector of `M`.
+        G (int, optional): Number of generations of infection to include. Defaults
+            to all generations that can occur within `T` days, which requires a
+            generation interval of at least 1 day.
+
+    Returns:
+        dict: with entry `incidence` with shape `(..., T, n_groups)`, and, if
+            `p_severe` is given, `severe` with the same shape
+    """
+    M = np.asarray(M, dtype=float)
+    w = np.asarray(generation_interval, dtype=float)
+    assert M.ndim >= 2 and M.shape[-2] == M.shape[-1], "M must be square"
+    assert (w >= 0.0).all() and np.isclose(w.sum(), 1.0), (
+        "Generation interval must be a probability distribution"
+    )
+    assert T >= 1
+    if G is None:
+        assert w[0] == 0.0, "Generation interval of 0 days requires G"
+    else:
+        assert G >= 0
+
+    n_groups = M.shape[-1]
+    if x0 is None:
+        x0 = ngm.linalg.dominant_eigen_batch(M).vector
+    x0 = np.broadcast_to(np.asarray(x0, dtype=float), M.shape[:-1])
+
+    # days beyond the horizon cannot affect it
+    w = w[:T]
+    days = np.arange(len(w))
+
+    if G is None:
+        # with a transform length of 4T, the tilt decays by TILT_DECAY^(1/4) over
+        # the horizon, and wrapped-around values are smaller by TILT_DECAY
+        n_fft = 2 ** math.ceil(math.log2(4 * T))
+        log_r = _log_singularity(M, w, T) + math.log(TILT_DECAY) / n_fft
+    else:
+        # finitely many generations occur on finitely many days; if the transform
+        # covers all of them, nothing wraps around, and no tilt is needed
+        n_fft = 2 ** math.ceil(math.log2(max(2 * T, G * (len(w) - 1) + 1)))
+        log_r = np.zeros(M.shape[:-2])
+
+    # generating function of w at each frequency, for each scenario
+    w_hat = np.fft.rfft(w * np.exp(days * log_r[..., np.newaxis]), n_fft)
+    A = w_hat[..., :, np.newaxis, np.newaxis] * M[..., np.newaxis, :, :]
+    b = np.broadcast_to(x0[..., np.newaxis, :], A.shape[:-1]).astype(complex)
+
+    if G is None:
+        y = np.linalg.solve(np.identity(n_groups) - A, b[..., np.newaxis])[..., 0]
+    else:
+        y = b
+        for _ in range(G):
+            y = b + np.einsum("...ij,...j->...i", A, y)
+
+    tilted = np.fft.irfft(y, n_fft, axis=-2)[..., :T, :]
+    # remove round-off from the FFTs, before undoing the tilt
+    tilted = np.clip(tilted, 0.0, None)
+    with np.errstate(over="ignore", invalid="ignore"):
+        scale = np.exp(-np.arange(T) * log_r[..., np.newaxis])
+        incidence = np.where(tilted > 0.0, tilted * scale[..., np.newaxis], 0.0)
+
+    out = {"incidence": incidence}
+    if p_severe is not None:
+        out["severe"] = out["incidence"] * p_severe
+
+    return out
+
+
+def _log_singularity(M: np.ndarray, w: np.ndarray, T: int) -> np.ndarray:
+    """Log of the radius z at which rho(M) w(z) = 1, for each matrix
+
+    This is the singularity of the generating function of the incidence, i.e.,
+    1 / z is the asymptotic daily growth factor. It is found by bisection, within
+    daily growth or decay by a factor of at most exp(600 / T), so that values
+    over the horizon stay within floating point range. Requires w(0) = 0.
+    """
+    rho = np.abs(np.linalg.eigvals(M)).max(axis=-1)
+    with np.errstate(divide="ignore"):
+        target = -np.log(rho)
+        log_w = np.log(w)
+
+    days = np.arange(len(w))
+    low = np.full(rho.shape, -600.0 / T)
+    high = np.full(rho.shape, 600.0 / T)
+    for _ in range(100):
+        mid = (low + high) / 2.0
+        # log w(z), which increases with z, by log-sum-exp
+        terms = log_w + days * mid[..., np.newaxis]
+        peak = terms.max(axis=-1)
+        log_w_hat = peak + np.log(np.exp(terms - peak[..., np.newaxis]).sum(axis=-1))
+        below = log_w_hat < target
+        low = np.where(below, mid, low)
+        high = np.where(below, high, mid)
+
+    return low
+
+
+def discretize_gamma(mean: float, sd: float, max_days: int) -> np.ndarray:
+    """
+    Discretized gamma distribution for the generation interval
+
+    The mass in the interval (d - 1, d] is assigned to day d, for d = 1, ...,
+    `max_days`, and the result is renormalized, so there is no mass on day 0.
+
+    Args:
+        mean (float): mean of the gamma distribution, in days
+        sd (float): standard deviation of the gamma distribution, in days
+        max_days (int): longest generation interval
+
+    Returns:
+        np.ndarray: probabilities for days 0, 1, ..., `max_days`
+    """
+    assert mean > 0.0 and sd > 0.0
+    assert max_days >= 1
+    shape = (mean / sd) ** 2
+    scale = sd**2 / mean
+
+    # integrate the density numerically on a fine grid within each day
+    n_per_day = 100
+    x = (np.arange(max_days * n_per_day) + 0.5) / n_per_day
+    log_density = (
+        (shape - 1.0) * np.log(x)
+        - x / scale
+        - math.lgamma(shape)
+        - shape * math.log(scale)
+    )
+    mass = np.exp(log_density).reshape(max_days, n_per_day).sum(axis=1)
+
+    return np.concatenate(([0.0], mass / mass.sum()))
@@ -0,0 +1,117 @@
+from typing import Any, Optional
+
+import numpy as np
+
+import ngm
+import ngm.linalg
+
+
+def rollout(
+    M_novax: np.ndarray,
+    n: np.ndarray,
+    n_vax: np.ndarray,
+    ve: float,
+    p_severe: np.ndarray,
+    x0: Optional[np.ndarray] = None,
+) -> dict[str, Any]:
+    """
+    Project infections through a vaccination campaign whose coverage changes
+    from generation to generation
+
+    Generation g = 1, ..., G of infections is produced by generation g - 1 via the
+    next generation matrix vaccinated according to the g-th row of the schedule.
+    Any number of schedules can be stacked along leading axes and are evaluated
+    together.
+
+    Args:
+        M_novax: Next Generation Matrix in the absence of administering any vaccines
+        n (np.array): Population sizes for each group
+        n_vax (np.array): Number of people vaccinated in each group at each
+            generation, with shape `(..., G, n_groups)`
+        ve (float): Vaccine efficacy
+        p_severe (np.array): Probability of severe outcome in each group
+        x0 (np.array, optional): Infections in generation 0. Defaults to a single
+            index infection, distributed according to the dominant eigenvector of
+            `M_novax`.
+
+    Returns:
+        dict: with entries, each with leading axes matching the schedule:
+            `M` (shape `(..., G, n_groups, n_groups)`), the vaccinated NGMs;
+            `infections`, `cumulative_infections`, and `cumulative_severe`
+            (shape `(..., G + 1, n_groups)`), in each generation 0, 1, ..., G
+    """
+    n = np.asarray(n, dtype=float)
+    n_vax = np.asarray(n_vax, dtype=float)
+    n_groups = len(n)
+    assert M_novax.shape == (n_groups, n_groups)
+    assert n_vax.ndim >= 2 and n_vax.shape[-1] == n_groups
+    assert (n >= n_vax).all(), "Vaccinated cannot exceed population size"
+
+    if x0 is None:
+        x0 = ngm.linalg.dominant_eigen(M_novax).vector
+
+    M_vax = ngm.vaccinate_M(M=M_novax, p_vax=n_vax / n, ve=ve)
+
+    # infections[..., g, :] = M_vax[..., g - 1] @ ... @ M_vax[..., 0] @ x0, applied
+    # one generation at a time to every schedule at once
+    G = n_vax.shape[-2]
+    infections = np.empty(n_vax.shape[:-2] + (G + 1, n_groups))
+    infections[..., 0, :] = x0
+    for g in range(G):
+        infections[..., g + 1, :] = np.einsum(
+            "...ij,...j->...i", M_vax[..., g, :, :], infections[..., g, :]
+        )
+
+    cumulative_infections = np.cumsum(infections, axis=-2)
+
+    return {
+        "M": M_vax,
+        "infections": infections,
+        "cumulative_infections": cumulative_infections,
+        "cumulative_severe": cumulative_infections * p_severe,
+    }
+
+
+def schedule_from_doses(
+    doses: np.ndarray, N_i: np.ndarray, strategy: str = "even"
+) -> np.ndarray:
+    """
+    Cumulative number vaccinated in each group, from the doses given in each phase
+
+    Args:
+        doses (np.array): Doses administered in each generation, with shape `(..., G)`
+        N_i (np.array): Population sizes for each group
+        strategy (str): Strategy for distributing the cumulative doses, as in
+            `distribute_vaccines`
+
+    Returns:
+        np.ndarray: number vaccinated, with shape `(..., G, n_groups)`, suitable
+            for `rollout`
+    """
+    doses = np.asarray(doses, dtype=float)
+    N_i = np.asarray(N_i, dtype=float)
+    assert (doses >= 0.0).all(), "Doses must be non-negative"
+    V = np.cumsum(doses, axis=-1)[..., np.newaxis]
+    assert (V <= N_i.sum()).all(), (
+        "Can't vaccinate more people than there are in the population"
+    )
+
+    # same allocation as `distribute_vaccines`, for all cumulative totals at once
+    if strategy == "even":
+        n_vax = V * N_i / N_i.sum()
+    else:
+        target_indices = list(map(int, strategy.split("_")))
+        is_target = np.isin(np.arange(len(N_i)), target_indices)
+        N_prioritized = N_i[is_target].sum()
+        N_remaining = N_i[~is_target].sum()
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fill_targets = np.where(is_target, V * N_i / N_prioritized, 0.0)
+            fill_remaining = np.where(
+                is_target, N_i, (V - N_prioritized) * N_i / N_remaining
+            )
+
+        n_vax = np.where(V <= N_prioritized, fill_targets, fill_remaining)
+
+    # guard against round-off when the whole population is vaccinated
+    return np.minimum(n_vax, N_i)
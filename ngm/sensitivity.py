@@ -0,0 +1,281 @@
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+import numpy as np
+import polars as pl
+
+import ngm
+import ngm.linalg
+
+Model = Callable[[dict[str, np.ndarray]], dict[str, np.ndarray]]
+
+
+def sobol_indices(
+    model: Model,
+    bounds: dict[str, tuple[float, float]],
+    N: int,
+    chunk_size: int = 1024,
+    n_boot: int = 100,
+    conf: float = 0.95,
+    seed: int = 0,
+    n_jobs: int = 1,
+) -> pl.DataFrame:
+    """
+    First-order and total Sobol indices, with bootstrap intervals
+
+    Inputs are independent and uniform within their bounds. The design follows
+    Saltelli: two quasi-random matrices A and B of N points each, and for each
+    input i, the matrix AB_i equal to A except for column i, taken from B. This
+    takes N * (d + 2) model evaluations for d inputs. First-order indices use
+    the Saltelli (2010) estimator and total indices the Jansen estimator.
+
+    The design is generated and evaluated in chunks of `chunk_size` rows of A,
+    and only running sums are kept, so memory does not grow with N. Bootstrap
+    intervals use the Poisson bootstrap, which weights each row by a Poisson(1)
+    draw in each replicate and so can also be accumulated chunk by chunk.
+
+    Args:
+        model (callable): maps a dict of input arrays, each with shape `(n,)`,
+            to a dict of output arrays, each with shape `(n,)`
+        bounds (dict): lower and upper bound for each input
+        N (int): number of rows in each of A and B
+        chunk_size (int): number of rows of A evaluated at once
+        n_boot (int): number of bootstrap replicates
+        conf (float): confidence level of the bootstrap intervals
+        seed (int): seed for the random shift of the design and the bootstrap
+        n_jobs (int): number of chunks evaluated in parallel threads
+
+    Returns:
+        pl.DataFrame: with one row per output and input, and columns `output`,
+            `input`, `S1`, `S1_low`, `S1_high`, `ST`, `ST_low`, and `ST_high`
+    """
+    assert N >= 2 and chunk_size >= 1 and n_boot >= 1 and n_jobs >= 1
+    assert 0.0 < conf < 1.0
+    names = list(bounds.keys())
+    low = np.array([bounds[name][0] for name in names], dtype=float)
+    high = np.array([bounds[name][1] for name in names], dtype=float)
+    assert (low <= high).all(), "Lower bounds must not exceed upper bounds"
+
+    shift = np.random.default_rng(seed).uniform(size=2 * len(names))
+    starts = range(0, N, chunk_size)
+
+    def run_chunk(i_chunk: int) -> dict[str, "_SobolSums"]:
+        start = starts[i_chunk]
+        count = min(chunk_size, N - start)
+        u = _kronecker(start, count, 2 * len(names), shift)
+        A = low + u[:, : len(names)] * (high - low)
+        B = low + u[:, len(names) :] * (high - low)
+        outputs = _evaluate_design(model, names, A, B)
+
+        weights = np.random.default_rng([seed, i_chunk]).poisson(
+            1.0, size=(count, n_boot)
+        )
+        return {
+            key: _SobolSums.from_chunk(fA, fB, fAB, weights)
+            for key, (fA, fB, fAB) in outputs.items()
+        }
+
+    totals: dict[str, _SobolSums] = {}
+    for sums in _map_bounded(run_chunk, len(starts), n_jobs):
+        for key, s in sums.items():
+            totals[key] = s if key not in totals else totals[key] + s
+
+    alpha = (1.0 - conf) / 2.0
+    rows = []
+    for key, s in totals.items():
+        S1, ST = s.indices()
+        S1_boot, ST_boot = s.boot_indices()
+        S1_low, S1_high = np.nanquantile(S1_boot, [alpha, 1.0 - alpha], axis=0)
+        ST_low, ST_high = np.nanquantile(ST_boot, [alpha, 1.0 - alpha], axis=0)
+        for i, name in enumerate(names):
+            rows.append(
+                {
+                    "output": key,
+                    "input": name,
+                    "S1": S1[i],
+                    "S1_low": S1_low[i],
+                    "S1_high": S1_high[i],
+                    "ST": ST[i],
+                    "ST_low": ST_low[i],
+                    "ST_high": ST_high[i],
+                }
+            )
+
+    return pl.DataFrame(rows)
+
+
+class _SobolSums:
+    """Running sums for the Sobol estimators: point estimates in the first row,
+    and one row per bootstrap replicate after that"""
+
+    def __init__(self, n, f, f2, s1, st):
+        self.n = n  # number of (weighted) rows in A
+        self.f = f  # sum of f(A) and f(B)
+        self.f2 = f2  # sum of squares of f(A) and f(B)
+        self.s1 = s1  # sums of f(B) * (f(AB_i) - f(A)), by input
+        self.st = st  # sums of (f(A) - f(AB_i))^2, by input
+
+    @classmethod
+    def from_chunk(cls, fA, fB, fAB, weights) -> "_SobolSums":
+        # first column of weights gives the point estimate
+        w = np.concatenate((np.ones((len(fA), 1)), weights), axis=1).T
+        return cls(
+            n=w.sum(axis=1),
+            f=w @ (fA + fB),
+            f2=w @ (fA**2 + fB**2),
+            s1=w @ (fB[:, np.newaxis] * (fAB - fA[:, np.newaxis])),
+            st=w @ ((fA[:, np.newaxis] - fAB) ** 2),
+        )
+
+    def __add__(self, other: "_SobolSums") -> "_SobolSums":
+        return _SobolSums(
+            n=self.n + other.n,
+            f=self.f + other.f,
+            f2=self.f2 + other.f2,
+            s1=self.s1 + other.s1,
+            st=self.st + other.st,
+        )
+
+    def _all_indices(self) -> tuple[np.ndarray, np.ndarray]:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = self.f / (2.0 * self.n)
+            var = self.f2 / (2.0 * self.n) - mean**2
+            S1 = self.s1 / self.n[:, np.newaxis] / var[:, np.newaxis]
+            ST = 0.5 * self.st / self.n[:, np.newaxis] / var[:, np.newaxis]
+        return S1, ST
+
+    def indices(self) -> tuple[np.ndarray, np.ndarray]:
+        S1, ST = self._all_indices()
+        return S1[0], ST[0]
+
+    def boot_indices(self) -> tuple[np.ndarray, np.ndarray]:
+        S1, ST = self._all_indices()
+        return S1[1:], ST[1:]
+
+
+def _map_bounded(f: Callable, n: int, n_jobs: int) -> Iterator:
+    """f(0), ..., f(n - 1), in order, run in up to `n_jobs` threads, with at most
+    2 * `n_jobs` results waiting to be consumed"""
+    if n_jobs == 1:
+        yield from map(f, range(n))
+        return
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        pending = deque()
+        for i in range(n):
+            pending.append(executor.submit(f, i))
+            if len(pending) >= 2 * n_jobs:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def _evaluate_design(
+    model: Model, names: list[str], A: np.ndarray, B: np.ndarray
+) -> dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Evaluate the model on A, B, and every AB_i in one vectorized call
+
+    Returns:
+        dict: for each output, f(A) and f(B) with shape `(n,)`, and f(AB_i)
+            with shape `(n, d)`
+    """
+    n, d = A.shape
+    AB = np.repeat(A[np.newaxis], d, axis=0)
+    AB[np.arange(d), :, np.arange(d)] = B.T
+    design = np.concatenate((A, B, AB.reshape(d * n, d)))
+
+    outputs = model({name: design[:, i] for i, name in enumerate(names)})
+    return {
+        key: (f[:n], f[n : 2 * n], f[2 * n :].reshape(d, n).T)
+        for key, f in outputs.items()
+    }
+
+
+def _kronecker(start: int, count: int, dim: int, shift: np.ndarray) -> np.ndarray:
+    """Points start, ..., start + count - 1 of a randomly shifted Kronecker
+    (R_d) low-discrepancy sequence in the unit hypercube"""
+    # phi is the positive root of x^(dim + 1) = x + 1
+    phi = 2.0
+    for _ in range(50):
+        phi = (1.0 + phi) ** (1.0 / (dim + 1))
+    alpha = (1.0 / phi) ** np.arange(1, dim + 1)
+
+    i = np.arange(start + 1, start + count + 1, dtype=float)
+    return (shift + np.outer(i, alpha)) % 1.0
+
+
+def scenario_model(
+    M_novax: np.ndarray,
+    N_i: np.ndarray,
+    n_vax: np.ndarray,
+    ve: float,
+    p_severe: np.ndarray,
+    G: int,
+) -> Model:
+    """
+    Model for `sobol_indices` that computes Re and severe infections after G
+    generations for a scenario, with some inputs varying
+
+    The inputs that can vary are named `ve`, `M_novax[i,j]`, `p_severe[i]`, and
+    `n_vax[i]`, with 0-based group indices. All other inputs are fixed at the
+    values given here. All samples are evaluated with one batched eigen solve.
+
+    Args:
+        M_novax: Next Generation Matrix in the absence of administering any vaccines
+        N_i (np.array): Population sizes for each group
+        n_vax (np.array): Number of people vaccinated in each group
+        ve (float): Vaccine efficacy
+        p_severe (np.array): Probability of severe outcome in each group
+        G (int): Number of generations of infections which have occurred.
+
+    Returns:
+        callable: model, with outputs `Re` and `deaths_after_G_generations`
+    """
+    base = {
+        "M_novax": np.asarray(M_novax, dtype=float),
+        "n_vax": np.asarray(n_vax, dtype=float),
+        "p_severe": np.asarray(p_severe, dtype=float),
+    }
+    N_i = np.asarray(N_i, dtype=float)
+
+    def model(inputs: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        n = len(next(iter(inputs.values())))
+        values = {key: np.repeat(x[np.newaxis], n, axis=0) for key, x in base.items()}
+        ve_samples = np.full(n, float(ve))
+        for name, x in inputs.items():
+            if name == "ve":
+                ve_samples = x
+            else:
+                key, idx = _parse_input(name)
+                values[key][(slice(None), *idx)] = x
+
+        assert ((0.0 <= ve_samples) & (ve_samples <= 1.0)).all()
+        # fold each sample's VE into its coverage, so VE can vary across the batch
+        M_vax = ngm.vaccinate_M(
+            M=values["M_novax"],
+            p_vax=values["n_vax"] / N_i * ve_samples[:, np.newaxis],
+            ve=1.0,
+        )
+        eigen = ngm.linalg.dominant_eigen_batch(M_vax)
+        generations = (eigen.value[:, np.newaxis] ** np.arange(G + 1)).sum(axis=1)
+        ifr = (eigen.vector * values["p_severe"]).sum(axis=1)
+
+        return {"Re": eigen.value, "deaths_after_G_generations": generations * ifr}
+
+    return model
+
+
+def _parse_input(name: str) -> tuple[str, tuple[int, ...]]:
+    match = re.fullmatch(r"(M_novax|p_severe|n_vax)\[(\d+)(?:,\s*(\d+))?\]", name)
+    if match is None:
+        raise ValueError(f"Unknown input {name}")
+
+    key = match.group(1)
+    idx = tuple(int(g) for g in match.groups()[1:] if g is not None)
+    if len(idx) != (2 if key == "M_novax" else 1):
+        raise ValueError(f"Wrong number of indices for {name}")
+
+    return key, idx
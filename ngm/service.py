@@ -0,0 +1,287 @@
+"""Local HTTP/JSON service for the NGM core
+
+Run with `python -m ngm.service`. Endpoints accept and return JSON:
+
+- `POST /run_ngm`: `M_novax`, `n`, `n_vax`, `ve`, as in `ngm.run_ngm`
+- `POST /distribute_vaccines`: `V`, `N_i`, `strategy`, as in `ngm.distribute_vaccines`
+- `POST /severity`: `eigenvalue`, `eigenvector`, `p_severe`, `G`, as in `ngm.severity`
+- `GET /health`
+
+Concurrent `run_ngm` requests that arrive within a short window are solved
+together in one batched eigen solve. Every response reports its latency.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+import ngm
+import ngm.linalg
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class NGMService:
+    """HTTP/JSON service that batches `run_ngm` requests
+
+    Args:
+        batch_window (float): seconds to wait for more requests after the first
+            request of a batch arrives
+        max_batch (int): maximum number of requests solved together
+        max_pending (int): maximum number of `run_ngm` requests accepted but not
+            yet answered. Further requests are rejected with status 503.
+    """
+
+    def __init__(
+        self, batch_window: float = 0.005, max_batch: int = 256, max_pending: int = 4096
+    ):
+        assert batch_window >= 0.0
+        assert max_batch >= 1
+        assert max_pending >= 1
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.n_pending = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.Server:
+        """Start serving. Use port 0 to pick a free port."""
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._run_batches())
+        return await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self, server: asyncio.Server):
+        server.close()
+        await server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        start = time.perf_counter()
+        try:
+            method, path, body = await _read_request(reader)
+        except (ValueError, asyncio.IncompleteReadError):
+            # malformed or truncated request; nothing to respond to
+            writer.close()
+            return
+
+        try:
+            status, payload = await self._route(method, path, body)
+        except (ValueError, KeyError, TypeError, AssertionError, RuntimeError) as e:
+            status, payload = 400, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        payload["latency_ms"] = 1e3 * (time.perf_counter() - start)
+        _write_response(writer, status, payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        if path == "/health":
+            return 200, {"status": "ok", "pending": self.n_pending}
+        elif path not in ["/run_ngm", "/distribute_vaccines", "/severity"]:
+            return 404, {"error": f"Unknown path {path}"}
+        elif method != "POST":
+            return 405, {"error": "Use POST"}
+
+        params = json.loads(body)
+
+        if path == "/run_ngm":
+            return await self._run_ngm(params)
+        elif path == "/distribute_vaccines":
+            n_vax = ngm.distribute_vaccines(
+                V=params["V"],
+                N_i=np.array(params["N_i"], dtype=float),
+                strategy=str(params.get("strategy", "even")),
+            )
+            return 200, {"n_vax": n_vax.tolist()}
+        else:
+            severe = ngm.severity(
+                eigenvalue=float(params["eigenvalue"]),
+                eigenvector=np.array(params["eigenvector"], dtype=float),
+                p_severe=np.array(params["p_severe"], dtype=float),
+                G=int(params["G"]),
+            )
+            return 200, {"severity": severe.tolist()}
+
+    async def _run_ngm(self, params: dict) -> tuple[int, dict]:
+        if self.n_pending >= self.max_pending:
+            return 503, {"error": "Too many pending requests"}
+
+        M_novax = np.array(params["M_novax"], dtype=float)
+        n = np.array(params["n"], dtype=float)
+        n_vax = np.array(params["n_vax"], dtype=float)
+        # JSON allows Infinity and NaN, which the eigen solver rejects
+        if not all(np.isfinite(x).all() for x in [M_novax, n, n_vax]):
+            raise ValueError("Inputs must be finite")
+        assert (n >= n_vax).all(), "Vaccinated cannot exceed population size"
+        M_vax = ngm.vaccinate_M(M=M_novax, p_vax=n_vax / n, ve=float(params["ve"]))
+        assert M_vax.ndim == 2
+
+        future = asyncio.get_running_loop().create_future()
+        self.n_pending += 1
+        try:
+            await self._queue.put((M_vax, future))
+            eigen, batch_size = await future
+        finally:
+            self.n_pending -= 1
+
+        return 200, {
+            "Re": float(eigen.value),
+            "infection_distribution": eigen.vector.tolist(),
+            "M": M_vax.tolist(),
+            "batch_size": batch_size,
+        }
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0.0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # solve off the event loop, so that requests keep being accepted
+            try:
+                results = await loop.run_in_executor(
+                    None, _solve_batch, [M for M, _ in batch]
+                )
+            except Exception as e:
+                # fail this batch only, and keep serving later requests
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                elif isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result((result, len(batch)))
+
+
+def _solve_batch(Ms: list[np.ndarray]) -> list:
+    """Dominant eigen for each matrix, with one solve per matrix size"""
+    out: list[Any] = [None] * len(Ms)
+    sizes = {M.shape[0] for M in Ms}
+    for size in sizes:
+        idx = [i for i, M in enumerate(Ms) if M.shape[0] == size]
+        try:
+            eigen = ngm.linalg.dominant_eigen_batch(np.stack([Ms[i] for i in idx]))
+            for j, i in enumerate(idx):
+                out[i] = ngm.linalg.Eigen(value=eigen.value[j], vector=eigen.vector[j])
+        except Exception:
+            # isolate the matrices that failed
+            for i in idx:
+                try:
+                    out[i] = ngm.linalg.dominant_eigen(Ms[i])
+                except Exception as e:
+                    out[i] = e
+
+    return out
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    method, path, _ = request_line.split(" ", 2)
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        key, value = line.split(":", 1)
+        headers[key.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return method, path, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: int, payload: dict):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"X-Latency-Ms: {payload['latency_ms']:.3f}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+
+
+async def request(
+    host: str, port: int, path: str, payload: Optional[dict] = None
+) -> tuple[int, dict]:
+    """Minimal local client: send one request and return (status, JSON response)"""
+    if payload is None:
+        method, body = "GET", b""
+    else:
+        method, body = "POST", json.dumps(payload).encode()
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+
+    status_line = (await reader.readline()).decode()
+    status = int(status_line.split(" ")[1])
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    _, _, body = response.partition(b"\r\n\r\n")
+    return status, json.loads(body)
+
+
+async def _serve(host: str, port: int, **kwargs):
+    service = NGMService(**kwargs)
+    server = await service.start(host, port)
+    print(f"Serving on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-pending", type=int, default=4096)
+    args = parser.parse_args()
+
+    asyncio.run(
+        _serve(
+            args.host,
+            args.port,
+            batch_window=args.batch_window,
+            max_batch=args.max_batch,
+            max_pending=args.max_pending,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
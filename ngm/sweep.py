@@ -0,0 +1,371 @@
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import polars as pl
+
+import ngm
+import ngm.scenario
+
+
+class ResultStore:
+    """Content-addressed on-disk store of scenario results
+
+    Each result is a parquet file named by the hash of its inputs, next to a
+    checksum of the file's contents. Results whose checksum does not match are
+    discarded. When the store grows beyond `max_bytes`, the least recently used
+    results are evicted. The total size is tracked as results are written and
+    removed, so the directory is only scanned once, and when evicting.
+
+    Args:
+        root (str or Path): directory for the store, created if needed
+        max_bytes (int): maximum total size of stored results
+    """
+
+    def __init__(self, root, max_bytes: int = 2**30):
+        assert max_bytes > 0
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        subdir = self.root / key[:2]
+        return subdir / f"{key}.parquet", subdir / f"{key}.sha256"
+
+    def get(self, key: str) -> Optional[pl.DataFrame]:
+        """Stored result, or None if it is missing or fails the integrity check"""
+        data_path, digest_path = self._paths(key)
+        try:
+            data = data_path.read_bytes()
+            digest = digest_path.read_text()
+        except FileNotFoundError:
+            return None
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            self.remove(key)
+            return None
+
+        # mark as recently used, for eviction
+        os.utime(data_path)
+        return pl.read_parquet(io.BytesIO(data))
+
+    def put(self, key: str, df: pl.DataFrame):
+        data_path, digest_path = self._paths(key)
+        data_path.parent.mkdir(exist_ok=True)
+
+        buffer = io.BytesIO()
+        df.write_parquet(buffer)
+        data = buffer.getvalue()
+
+        old_size = data_path.stat().st_size if data_path.exists() else 0
+        # write the data before its checksum, so a partial write is never valid
+        _atomic_write(data_path, data)
+        if self._size is not None:
+            self._size += len(data) - old_size
+        _atomic_write(digest_path, hashlib.sha256(data).hexdigest().encode())
+
+    def remove(self, key: str):
+        data_path, digest_path = self._paths(key)
+        if self._size is not None and data_path.exists():
+            self._size -= data_path.stat().st_size
+        data_path.unlink(missing_ok=True)
+        digest_path.unlink(missing_ok=True)
+
+    def __contains__(self, key: str) -> bool:
+        return all(path.exists() for path in self._paths(key))
+
+    def size(self) -> int:
+        """Total size of stored results, in bytes"""
+        if self._size is None:
+            self._size = sum(
+                path.stat().st_size for path in self.root.glob("*/*.parquet")
+            )
+        return self._size
+
+    def evict(self):
+        """Remove least recently used results until the store fits in `max_bytes`"""
+        if self.size() <= self.max_bytes:
+            return
+
+        entries = sorted(
+            (path.stat().st_mtime, path.stat().st_size, path.stem)
+            for path in self.root.glob("*/*.parquet")
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
+
+        self._size = total
+
+
+def _atomic_write(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def scenario_key(params: dict, distributions_as_percents: bool = False) -> str:
+    """Hash of everything that determines the result of `simulate_scenario`
+
+    The inputs are the NGM, group names and sizes, doses in each group, VE,
+    probabilities of severe outcomes, number of generations, and the source code
+    of the modules that `simulate_scenario` depends on.
+    """
+    N_i = params["n_total"] * np.array(params["pop_props"])
+    if "n_vax" in params:
+        n_vax = np.asarray(params["n_vax"], dtype=float)
+    else:
+        n_vax = ngm.distribute_vaccines(
+            params["n_vax_total"], N_i, strategy=params["vax_strategy"]
+        )
+
+    inputs = {
+        "M_novax": np.asarray(params["M_novax"], dtype=float).tolist(),
+        "group_names": [str(grp) for grp in params["group_names"]],
+        "N_i": N_i.tolist(),
+        "n_vax": n_vax.tolist(),
+        "ve": float(params["ve"]),
+        "p_severe": np.asarray(params["p_severe"], dtype=float).tolist(),
+        "G": int(params["G"]),
+        "distributions_as_percents": distributions_as_percents,
+        "code": _code_hash(),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+# modules that determine the results of `simulate_scenario`
+RESULT_MODULES = ["__init__.py", "linalg.py", "scenario.py"]
+
+
+@functools.cache
+def _code_hash() -> str:
+    """Hash of the source of `RESULT_MODULES`, which changes whenever results might"""
+    digest = hashlib.sha256()
+    for name in RESULT_MODULES:
+        path = Path(ngm.__file__).parent / name
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def run_sweep(
+    scenarios: Sequence[dict],
+    store: ResultStore,
+    chunk_size: int = 100,
+    distributions_as_percents: bool = False,
+    errors: Optional[list] = None,
+) -> pl.DataFrame:
+    """
+    Run `simulate_scenario` for many scenarios, persisting results as they complete
+
+    Scenarios are run in chunks. After each chunk, its results are written to the
+    store, so an interrupted sweep can be restarted without repeating finished
+    chunks. Results are keyed by their inputs, so sweeps that overlap with earlier
+    sweeps reuse their results.
+
+    Args:
+        scenarios (list of dict): parameters for `simulate_scenario`
+        store (ResultStore): where results are persisted
+        chunk_size (int): number of scenarios run between writes to the store
+        distributions_as_percents (bool): passed to `simulate_scenario`
+        errors (list, optional): if given, scenarios that raise an exception get
+            a row of NaN, which is not stored, and the exception is appended
+            here. Otherwise, the exception is raised.
+
+    Returns:
+        pl.DataFrame: one row per scenario, in order
+    """
+    assert chunk_size >= 1
+    keys = [scenario_key(s, distributions_as_percents) for s in scenarios]
+    results: dict[str, pl.DataFrame] = {}
+    # schema of a freshly computed result, by group names
+    schemas: dict[tuple[str, ...], pl.Schema] = {}
+
+    failed: set[str] = set()
+
+    def simulate(i: int) -> pl.DataFrame:
+        df = _simulate(scenarios[i], distributions_as_percents, errors)
+        if df is None:
+            failed.add(keys[i])
+            return ngm.scenario.failed_scenario(scenarios[i])
+
+        schemas[_group_names(scenarios[i])] = df.schema
+        return df
+
+    for start in range(0, len(scenarios), chunk_size):
+        chunk = range(start, min(start + chunk_size, len(scenarios)))
+        new = {}
+        cached = {}
+        for i in chunk:
+            if keys[i] in results or keys[i] in new or keys[i] in cached:
+                continue
+
+            df = store.get(keys[i])
+            if df is None:
+                new[keys[i]] = simulate(i)
+            else:
+                cached[keys[i]] = (i, df)
+
+        # a stored result that doesn't match the schema of a result computed in
+        # this sweep is stale. Keys include the code, so this is only a safeguard,
+        # and results are never recomputed just to find the schema.
+        for key, (i, df) in cached.items():
+            schema = schemas.get(_group_names(scenarios[i]))
+            if schema is not None and df.schema != schema:
+                new[key] = simulate(i)
+            else:
+                results[key] = df
+
+        for key, df in new.items():
+            if key not in failed:
+                store.put(key, df)
+        results.update(new)
+        store.evict()
+
+    if len(scenarios) == 0:
+        return pl.DataFrame()
+    else:
+        return pl.concat([results[key] for key in keys])
+
+
+def _simulate(
+    scenario: dict, distributions_as_percents: bool, errors: Optional[list]
+) -> Optional[pl.DataFrame]:
+    """`simulate_scenario`, or None if it fails and errors are being collected"""
+    try:
+        return ngm.scenario.simulate_scenario(
+            scenario, distributions_as_percents=distributions_as_percents
+        )
+    except Exception as e:
+        if errors is None:
+            raise
+        errors.append(e)
+        return None
+
+
+def _group_names(scenario: dict) -> tuple[str, ...]:
+    return tuple(str(grp) for grp in scenario["group_names"])
+
+
+class SweepWorker:
+    """Run `simulate_scenario` for many scenarios on a background thread
+
+    Results are available, in order, as each chunk of scenarios completes, so
+    that they can be rendered while the sweep is still running. A cancelled
+    sweep stops after its current chunk. Scenarios that raise an exception get
+    a row of NaN, and the first such exception is kept in `error`.
+
+    Args:
+        scenarios (list of dict): parameters for `simulate_scenario`
+        chunk_size (int): number of scenarios run between updates to the results
+        store (ResultStore, optional): if given, results are persisted and reused
+            as in `run_sweep`
+        distributions_as_percents (bool): passed to `simulate_scenario`
+    """
+
+    def __init__(
+        self,
+        scenarios: Sequence[dict],
+        chunk_size: int = 50,
+        store: Optional[ResultStore] = None,
+        distributions_as_percents: bool = False,
+    ):
+        assert chunk_size >= 1
+        self.scenarios = list(scenarios)
+        self.chunk_size = chunk_size
+        self.store = store
+        self.distributions_as_percents = distributions_as_percents
+        self.error: Optional[BaseException] = None
+        self._chunks: list[pl.DataFrame] = []
+        self._n_done = 0
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "SweepWorker":
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        """Has the sweep finished, been cancelled, or failed?"""
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def progress(self) -> float:
+        """Fraction of scenarios completed"""
+        if len(self.scenarios) == 0:
+            return 1.0
+        with self._lock:
+            return self._n_done / len(self.scenarios)
+
+    def results(self) -> pl.DataFrame:
+        """Results for the scenarios completed so far, in order"""
+        with self._lock:
+            chunks = list(self._chunks)
+
+        if len(chunks) == 0:
+            return pl.DataFrame()
+        else:
+            return pl.concat(chunks)
+
+    def _run(self):
+        try:
+            for start in range(0, len(self.scenarios), self.chunk_size):
+                if self._cancel.is_set():
+                    break
+
+                chunk = self.scenarios[start : start + self.chunk_size]
+                errors: list = []
+                if self.store is None:
+                    dfs = [
+                        _simulate(s, self.distributions_as_percents, errors)
+                        for s in chunk
+                    ]
+                    df = pl.concat(
+                        [
+                            ngm.scenario.failed_scenario(s) if df is None else df
+                            for s, df in zip(chunk, dfs)
+                        ]
+                    )
+                else:
+                    df = run_sweep(
+                        chunk,
+                        self.store,
+                        chunk_size=len(chunk),
+                        distributions_as_percents=self.distributions_as_percents,
+                        errors=errors,
+                    )
+
+                if errors and self.error is None:
+                    self.error = errors[0]
+                with self._lock:
+                    self._chunks.append(df)
+                    self._n_done += len(chunk)
+        except Exception as e:
+            self.error = e
@@ -10,3 +10,40 @@ def test_app():
     at = AppTest.from_file("ngm/app.py")
     at.run()
     assert not at.exception
+
+
+@pytest.mark.filterwarnings(
+    r"ignore:\s+Deprecated since `altair=5.5.0`. Use altair.theme instead."
+)
+def test_app_frontier():
+    at = AppTest.from_file("ngm/app.py")
+    at.run()
+    at.checkbox[0].check().run()
+    assert not at.exception
+
+
+@pytest.mark.filterwarnings(
+    r"ignore:\s+Deprecated since `altair=5.5.0`. Use altair.theme instead."
+)
+def test_app_calendar():
+    at = AppTest.from_file("ngm/app.py")
+    at.run()
+    at.checkbox[1].check().run()
+    assert not at.exception
+
+
+@pytest.mark.filterwarnings(
+    r"ignore:\s+Deprecated since `altair=5.5.0`. Use altair.theme instead."
+)
+def test_app_sweep():
+    at = AppTest.from_file("ngm/app.py")
+    at.run()
+    at.checkbox[2].check().run()
+    assert not at.exception
+    assert len(at.get("progress")) == 1
+
+    # changing the inputs cancels the running sweep
+    _, worker = at.session_state["sweep"]
+    at.selectbox[0].select("Vaccine efficacy").run()
+    assert not at.exception
+    assert worker.cancelled
@@ -131,3 +131,83 @@ class TestIsDiagonalizable:
     def test_simple_dontknow(self):
         L_matrix = np.array([[1, 0, 0], [1, 0, 0], [1, 1, 1]])
         assert ngm.linalg.is_diagonalizable(L_matrix) is None
+
+
+class TestPowerEigen:
+    def test_matches_dominant_eigen(self):
+        X = np.array([[3.1, 0.15, 1.7], [0.78, 1.5, 0.1], [0.32, 0.98, 1.1]])
+        expected = ngm.linalg.dominant_eigen(X)
+        current = ngm.linalg.power_eigen(X)
+        assert np.isclose(current.value, expected.value)
+        assert np.allclose(current.vector, expected.vector)
+
+    def test_warm_start(self):
+        X = np.array([[3.1, 0.15, 1.7], [0.78, 1.5, 0.1], [0.32, 0.98, 1.1]])
+        x0 = ngm.linalg.dominant_eigen(X).vector
+        current = ngm.linalg.power_eigen(X, x0=x0, max_iter=5)
+        assert np.allclose(current.vector, x0)
+
+    def test_periodic(self):
+        # eigenvalues 1 and -1: plain power iteration would not converge
+        X = np.array([[0.0, 1.0], [1.0, 0.0]])
+        current = ngm.linalg.power_eigen(X, x0=np.array([1.0, 0.0]))
+        assert np.isclose(current.value, 1.0)
+        assert np.allclose(current.vector, np.array([0.5, 0.5]))
+
+
+class TestTopEigen:
+    def test_matches_eig(self):
+        X = np.array([[3.1, 0.15, 1.7], [0.78, 1.5, 0.1], [0.32, 0.98, 1.1]])
+        current = ngm.linalg.top_eigen(X, k=2)
+        expected = sorted(np.linalg.eigvals(X), key=lambda x: -abs(x))[:2]
+        assert np.allclose(current.value, expected)
+        # columns are eigenvectors
+        assert np.allclose(X @ current.vector, current.vector * current.value)
+
+    def test_fallback(self):
+        # a random matrix has no gap after its dominant eigenvalue, so subspace
+        # iteration stalls
+        X = np.random.default_rng(0).uniform(size=(200, 200))
+        current = ngm.linalg.top_eigen(X, k=2, oversample=0, max_iter=5)
+        expected = sorted(np.linalg.eigvals(X), key=lambda x: -abs(x))[:2]
+        assert np.allclose(np.abs(current.value), np.abs(expected))
+
+    def test_batched(self):
+        rng = np.random.default_rng(1)
+        a = np.arange(200)
+        kernel = np.exp(-np.abs(a[:, np.newaxis] - a[np.newaxis, :]) / 50.0)
+        X = np.stack([kernel * rng.uniform(0.5, 1.5, 200) for _ in range(4)])
+        current = ngm.linalg.top_eigen(X, k=3)
+        assert current.value.shape == (4, 3)
+        assert current.vector.shape == (4, 200, 3)
+        # converged by iteration, with real Ritz values
+        assert current.value.dtype == complex and current.vector.dtype == complex
+        for i in range(4):
+            expected = sorted(np.linalg.eigvals(X[i]), key=lambda x: -abs(x))[:3]
+            assert np.allclose(current.value[i], expected)
+
+    def test_complex_pair(self):
+        # rotation-like block has eigenvalues of equal modulus
+        X = np.array([[2.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, 1.0, 0.0]])
+        X[1:, 1:] = np.array([[0.5, -0.5], [0.5, 0.5]])
+        current = ngm.linalg.top_eigen(X, k=3)
+        assert np.allclose(
+            np.sort_complex(current.value), np.sort_complex(np.linalg.eigvals(X))
+        )
+
+
+class TestConvergenceDiagnostics:
+    def test_simple(self):
+        # eigenvalues 3 and -1
+        X = np.array([[1.0, 2.0], [2.0, 1.0]])
+        current = ngm.linalg.convergence_diagnostics(X, eps=0.01)
+        assert np.isclose(current.value, 3.0)
+        assert np.isclose(current.ratio, 1.0 / 3.0)
+        assert current.generations == 5
+        # after that many generations, infections are close to the eigenvector
+        x = np.linalg.matrix_power(X, 5) @ np.array([1.0, 0.0])
+        assert np.allclose(x / x.sum(), [0.5, 0.5], atol=0.01)
+
+    def test_periodic(self):
+        X = np.array([[0.0, 1.0], [1.0, 0.0]])
+        assert np.isinf(ngm.linalg.convergence_diagnostics(X).generations)
@@ -129,3 +129,118 @@ def test_exp_growth():
         ngm.severity(r0, distribution, p_severe, G).sum()
         == ngm.exp_growth_model_severity(r0, distribution, p_severe, G)[-1, 2]
     )
+
+
+def test_distribute_vaccine_roundoff():
+    """Doses that don't divide evenly still pass the total check"""
+    N_i = np.array([0.05, 0.45, 0.5]) * 1e7
+    for strategy in ["even", "0", "1_2"]:
+        n_vax = ngm.distribute_vaccines(V=1234567.89, N_i=N_i, strategy=strategy)
+        assert np.isclose(n_vax.sum(), 1234567.89)
+
+
+def naive_type_reproduction(M):
+    n = M.shape[0]
+    out = np.zeros(n)
+    for i in range(n):
+        Q = M.copy()
+        Q[i, :] = 0.0
+        if np.max(np.abs(np.linalg.eigvals(Q))) >= 1.0:
+            out[i] = np.inf
+        else:
+            out[i] = (M @ np.linalg.inv(np.identity(n) - Q))[i, i]
+    return out
+
+
+def test_type_reproduction():
+    M = np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]])
+    batch = np.stack(
+        [
+            M,
+            0.3 * M,
+            1.5 * np.array([[0.5, 0.2, 2.0], [0.3, 0.2, 0.0], [0.1, 0.1, 0.1]]),
+        ]
+    )
+    current = ngm.type_reproduction_numbers(batch)
+    assert current.shape == (3, 3)
+    for i in range(3):
+        assert_allclose(current[i], naive_type_reproduction(batch[i]))
+
+    # T_i is on the same side of 1 as Re
+    assert (current[1] < 1.0).all()
+    assert np.isinf(current[2, 1])
+    assert (current[2, [0, 2]] > 1.0).all()
+
+
+def test_type_reproduction_singular():
+    """If M has an eigenvalue of 1, I - M is singular, but T_i is defined"""
+    batch = np.stack(
+        [
+            np.array([[0.5, 0.0, 0.2], [0.0, 1.0, 0.0], [0.25, 0.0, 0.3]]),
+            np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]]),
+        ]
+    )
+    current = ngm.type_reproduction_numbers(batch)
+    for i in range(2):
+        assert_allclose(current[i], naive_type_reproduction(batch[i]))
+    assert_allclose(current[0], [np.inf, 1.0, np.inf])
+
+
+def test_type_reproduction_single_type():
+    """With only one group, the type reproduction number is R"""
+    assert_allclose(ngm.type_reproduction_numbers(np.array([[2.5]])), [2.5])
+
+
+class TestVaccineProducts:
+    M_novax = np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]])
+    n = np.array([0.05, 0.45, 0.5]) * 1e7
+    # doses of each of two products in each group
+    n_vax = np.array([[1e5, 5e5, 0.0], [2e5, 1e6, 1e6]])
+    ve = np.array([[0.9, 0.8, 0.7], [0.5, 0.5, 0.4]])
+    ve_infectiousness = np.array([[0.3, 0.3, 0.3], [0.6, 0.5, 0.0]])
+
+    def test_same_product(self):
+        """Splitting doses of one product into two products changes nothing"""
+        ve = np.array([0.7, 0.8, 0.9])
+        split = ngm.vaccinate_M(self.M_novax, self.n_vax / self.n, np.stack([ve, ve]))
+        single = ngm.vaccinate_M(self.M_novax, self.n_vax.sum(axis=0) / self.n, ve)
+        assert_allclose(split, single)
+
+    def test_matches_expanded_ngm(self):
+        """Same Re as the NGM with separate types for each product in each group"""
+        current = ngm.run_ngm(
+            self.M_novax, self.n, self.n_vax, self.ve, self.ve_infectiousness
+        )
+
+        # types are (status, group), with status 0 unvaccinated
+        p = np.concatenate(([1 - self.n_vax.sum(axis=0) / self.n], self.n_vax / self.n))
+        susceptibility = p * np.concatenate(([np.ones(3)], 1 - self.ve))
+        infectiousness = np.concatenate(([np.ones(3)], 1 - self.ve_infectiousness))
+        expanded = (
+            susceptibility.reshape(-1)[:, np.newaxis]
+            * np.tile(self.M_novax, (3, 3))
+            * infectiousness.reshape(-1)[np.newaxis, :]
+        )
+        expected = ngm.linalg.dominant_eigen(expanded)
+
+        assert np.isclose(current["Re"], expected.value)
+        assert_allclose(
+            current["infection_distribution"],
+            expected.vector.reshape(3, 3).sum(axis=0),
+        )
+
+    def test_batched(self):
+        rng = np.random.default_rng(0)
+        n_vax = rng.uniform(0.0, 0.5, size=(20, 2, 3)) * self.n
+        current = ngm.run_ngm(self.M_novax, self.n, n_vax, self.ve, 0.2)
+        assert current["M"].shape == (20, 3, 3)
+        for i in range(20):
+            expected = ngm.run_ngm(self.M_novax, self.n, n_vax[i], self.ve, 0.2)
+            assert np.isclose(current["Re"][i], expected["Re"])
+            assert_allclose(
+                current["infection_distribution"][i], expected["infection_distribution"]
+            )
+
+    def test_total_coverage(self):
+        with pytest.raises(AssertionError, match="cannot exceed"):
+            ngm.run_ngm(self.M_novax, self.n, self.n_vax * 5, self.ve)
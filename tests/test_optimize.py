@@ -0,0 +1,91 @@
+import warnings
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+import ngm
+import ngm.optimize
+
+M_novax = np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]])
+N_i = np.array([0.05, 0.45, 0.5]) * 1e7
+ve = 0.74
+
+
+def Re_for_doses(V, strategy):
+    n_vax = ngm.distribute_vaccines(V, N_i, strategy=strategy)
+    return ngm.run_ngm(M_novax=M_novax, n=N_i, n_vax=n_vax, ve=ve)["Re"]
+
+
+class TestDoseThreshold:
+    def test_brackets_target(self):
+        V = ngm.optimize.dose_threshold(M_novax, N_i, ve, strategy="even", tol=1.0)
+        assert isinstance(V, float)
+        assert Re_for_doses(V, "even") < 1.0
+        assert Re_for_doses(V - 1.0, "even") >= 1.0
+
+    def test_vectorized(self):
+        strategies = ["even", "0"]
+        targets = [1.0, 1.5]
+        out = ngm.optimize.dose_threshold(
+            M_novax, N_i, ve, strategy=strategies, target_Re=targets, tol=10.0
+        )
+        assert out.shape == (2, 2)
+        for i, s in enumerate(strategies):
+            for j, t in enumerate(targets):
+                expected = ngm.optimize.dose_threshold(
+                    M_novax, N_i, ve, strategy=s, target_Re=t, tol=10.0
+                )
+                assert_allclose(out[i, j], expected, atol=10.0)
+
+        # larger targets need fewer doses
+        assert (out[:, 1] < out[:, 0]).all()
+
+    def test_already_below(self):
+        assert ngm.optimize.dose_threshold(M_novax, N_i, ve, target_Re=10.0) == 0.0
+
+    def test_unreachable(self):
+        assert np.isnan(ngm.optimize.dose_threshold(M_novax, N_i, ve=0.1))
+
+
+class TestParetoFrontier:
+    p_severe = np.array([0.02, 0.06, 0.02])
+
+    def test_frontier(self):
+        df = ngm.optimize.pareto_frontier(
+            M_novax, N_i, ve, V=1e6, p_severe=self.p_severe, G=10, n_weights=5
+        )
+        assert df.columns == ["weight", "Re", "severe", "n_vax_0", "n_vax_1", "n_vax_2"]
+        # every allocation uses all doses within group sizes
+        n_vax = df.select(["n_vax_0", "n_vax_1", "n_vax_2"]).to_numpy()
+        assert_allclose(n_vax.sum(axis=1), 1e6)
+        assert (n_vax >= 0.0).all() and (n_vax <= N_i).all()
+        # sorted by Re, so severe infections are decreasing
+        assert (np.diff(df["Re"].to_numpy()) >= 0.0).all()
+        assert (np.diff(df["severe"].to_numpy()) < 0.0).all()
+
+    def test_endpoints_beat_even(self):
+        df = ngm.optimize.pareto_frontier(
+            M_novax, N_i, ve, V=1e6, p_severe=self.p_severe, G=10, n_weights=3
+        )
+        n_vax = ngm.distribute_vaccines(1e6, N_i, strategy="even")
+        even = ngm.run_ngm(M_novax=M_novax, n=N_i, n_vax=n_vax, ve=ve)
+        severe = ngm.severity(
+            even["Re"], even["infection_distribution"], self.p_severe, 10
+        ).sum()
+        assert df["Re"].min() <= even["Re"]
+        assert df["severe"].min() <= severe
+
+    def test_no_doses(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            df = ngm.optimize.pareto_frontier(
+                M_novax, N_i, ve, V=0.0, p_severe=self.p_severe, G=10, n_weights=3
+            )
+        n_vax = df.select(["n_vax_0", "n_vax_1", "n_vax_2"]).to_numpy()
+        assert (n_vax == 0.0).all()
+
+    def test_project_capped_simplex(self):
+        x = ngm.optimize._project_capped_simplex(
+            np.array([5.0, -1.0, 2.0]), upper=np.array([3.0, 3.0, 3.0]), total=4.0
+        )
+        assert_allclose(x, np.array([3.0, 0.0, 1.0]))
@@ -0,0 +1,79 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+import ngm
+import ngm.linalg
+import ngm.renewal
+
+M = np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]])
+p_severe = np.array([0.02, 0.06, 0.02])
+
+
+def test_matches_renewal_loop():
+    w = ngm.renewal.discretize_gamma(mean=5.0, sd=2.0, max_days=20)
+    T = 40
+    current = ngm.renewal.daily_incidence(M, w, T, p_severe=p_severe)
+
+    # direct day-by-day solution of the renewal equation
+    expected = np.zeros((T, 3))
+    expected[0] = ngm.linalg.dominant_eigen(M).vector
+    for t in range(1, T):
+        past = sum(w[s] * expected[t - s] for s in range(1, min(t, len(w) - 1) + 1))
+        expected[t] = M @ past
+
+    assert_allclose(current["incidence"], expected, rtol=1e-8, atol=1e-12)
+    assert_allclose(current["severe"], expected * p_severe)
+
+
+def test_fast_growth_long_horizon():
+    """Incidence growing by many orders of magnitude stays finite and accurate"""
+    w = ngm.renewal.discretize_gamma(mean=5.0, sd=2.0, max_days=15)
+    T = 365
+    current = ngm.renewal.daily_incidence(3.0 * M, w, T)["incidence"]
+
+    expected = np.zeros((T, 3))
+    expected[0] = ngm.linalg.dominant_eigen(M).vector
+    for t in range(1, T):
+        past = sum(w[s] * expected[t - s] for s in range(1, min(t, len(w) - 1) + 1))
+        expected[t] = 3.0 * M @ past
+
+    assert np.isfinite(current).all()
+    assert_allclose(current[-30:], expected[-30:], rtol=1e-8)
+
+
+def test_finite_generations():
+    """All infections in the first G generations, including same-day ones"""
+    w = np.array([0.3, 0.7])
+    x0 = ngm.linalg.dominant_eigen(M).vector
+    current = ngm.renewal.daily_incidence(M, w, T=10, x0=x0, G=3)["incidence"]
+    expected = sum(np.linalg.matrix_power(M, k) @ x0 for k in range(4))
+    assert_allclose(current.sum(axis=0), expected)
+
+
+def test_generations_match_severity():
+    """With a fixed one-day generation interval, days are generations"""
+    w = np.array([0.0, 1.0])
+    eigen = ngm.linalg.dominant_eigen(M)
+    current = ngm.renewal.daily_incidence(M, w, T=8, p_severe=p_severe)
+    assert_allclose(
+        current["severe"].sum(axis=0),
+        ngm.severity(eigen.value, eigen.vector, p_severe, 7),
+    )
+
+
+def test_batched_scenarios():
+    w = ngm.renewal.discretize_gamma(mean=3.0, sd=1.0, max_days=10)
+    Ms = ngm.vaccinate_M(M, np.array([[0.0, 0.0, 0.0], [0.5, 0.2, 0.1]]), ve=0.7)
+    batched = ngm.renewal.daily_incidence(Ms, w, T=30)["incidence"]
+    assert batched.shape == (2, 30, 3)
+    for i in range(2):
+        assert_allclose(
+            batched[i], ngm.renewal.daily_incidence(Ms[i], w, T=30)["incidence"]
+        )
+
+
+def test_discretize_gamma():
+    w = ngm.renewal.discretize_gamma(mean=5.0, sd=2.0, max_days=30)
+    assert w[0] == 0.0
+    assert np.isclose(w.sum(), 1.0)
+    assert np.isclose(np.dot(np.arange(31), w), 5.5, atol=0.05)
@@ -0,0 +1,67 @@
+import numpy as np
+from numpy.testing import assert_allclose
+
+import ngm
+import ngm.linalg
+import ngm.rollout
+
+M_novax = np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]])
+N_i = np.array([0.05, 0.45, 0.5]) * 1e7
+p_severe = np.array([0.02, 0.06, 0.02])
+ve = 0.74
+
+
+def test_vaccinate_M_batched():
+    p_vax = np.array([[0.0, 0.0, 0.0], [0.5, 0.1, 0.2]])
+    current = ngm.vaccinate_M(M=M_novax, p_vax=p_vax, ve=ve)
+    assert current.shape == (2, 3, 3)
+    for i in range(2):
+        assert_allclose(current[i], ngm.vaccinate_M(M=M_novax, p_vax=p_vax[i], ve=ve))
+
+
+def test_constant_schedule_matches_severity():
+    """A static campaign starting from its stationary distribution reproduces `severity`"""
+    G = 7
+    n_vax = np.array([2.5e5, 2.5e5, 5e5])
+    static = ngm.run_ngm(M_novax=M_novax, n=N_i, n_vax=n_vax, ve=ve)
+
+    current = ngm.rollout.rollout(
+        M_novax=M_novax,
+        n=N_i,
+        n_vax=np.tile(n_vax, (G, 1)),
+        ve=ve,
+        p_severe=p_severe,
+        x0=static["infection_distribution"],
+    )
+
+    assert current["infections"].shape == (G + 1, 3)
+    expected = ngm.severity(static["Re"], static["infection_distribution"], p_severe, G)
+    assert_allclose(current["cumulative_severe"][-1], expected)
+
+
+def test_batched_schedules():
+    doses = np.array([[0.0, 1e6, 1e6], [1e6, 1e6, 0.0], [2e6, 0.0, 0.0]])
+    schedules = ngm.rollout.schedule_from_doses(doses, N_i, strategy="0")
+    assert schedules.shape == (3, 3, 3)
+    assert_allclose(schedules[:, -1, :].sum(axis=-1), 2e6)
+
+    batched = ngm.rollout.rollout(M_novax, N_i, schedules, ve, p_severe)
+    for i in range(3):
+        single = ngm.rollout.rollout(M_novax, N_i, schedules[i], ve, p_severe)
+        assert_allclose(
+            batched["cumulative_infections"][i], single["cumulative_infections"]
+        )
+
+    # vaccinating earlier can only reduce infections
+    final = batched["cumulative_infections"][:, -1, :].sum(axis=-1)
+    assert final[2] <= final[1] <= final[0]
+
+
+def test_schedule_matches_distribute_vaccines():
+    doses = np.array([1e5, 4e5, 3e6, 6.5e6])
+    for strategy in ["even", "0", "1_2"]:
+        current = ngm.rollout.schedule_from_doses(doses, N_i, strategy=strategy)
+        for g, V in enumerate(np.cumsum(doses)):
+            assert_allclose(
+                current[g], ngm.distribute_vaccines(V, N_i, strategy=strategy)
+            )
@@ -0,0 +1,21 @@
+import numpy as np
+
+import ngm.scenario
+
+
+def test_eigenvalue_of_one():
+    """An NGM with an eigenvalue of exactly 1, e.g., an isolated group"""
+    params = {
+        "group_names": ["core", "children", "adults"],
+        "n_total": 1e7,
+        "pop_props": [0.05, 0.45, 0.5],
+        "M_novax": np.array([[3.0, 0.0, 0.2], [0.0, 1.0, 0.0], [0.25, 0.0, 1.5]]),
+        "p_severe": np.array([0.02, 0.06, 0.02]),
+        "n_vax": np.zeros(3),
+        "ve": 0.74,
+        "G": 10,
+    }
+    result = ngm.scenario.simulate_scenario(params)
+    assert np.isclose(result["Re"][0], 3.0326, atol=1e-4)
+    # controlling any one group leaves an outbreak in another
+    assert np.isinf(result.select("^type_reproduction_.*$").to_numpy()).all()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from numpy.testing import assert_allclose
+from polars.testing import assert_frame_equal
+
+import ngm
+import ngm.sensitivity
+
+BOUNDS = {name: (-np.pi, np.pi) for name in ["x1", "x2", "x3"]}
+
+
+def ishigami(x):
+    y = np.sin(x["x1"]) + 7.0 * np.sin(x["x2"]) ** 2
+    return {"y": y + 0.1 * x["x3"] ** 4 * np.sin(x["x1"])}
+
+
+class TestSobolIndices:
+    def test_ishigami(self):
+        df = ngm.sensitivity.sobol_indices(ishigami, BOUNDS, N=2**13)
+        # analytical values
+        assert_allclose(df["S1"], [0.3139, 0.4424, 0.0], atol=0.03)
+        assert_allclose(df["ST"], [0.5576, 0.4424, 0.2437], atol=0.03)
+        assert (df["S1_low"] <= df["S1"]).all() and (df["S1"] <= df["S1_high"]).all()
+        assert (df["ST_low"] <= df["ST"]).all() and (df["ST"] <= df["ST_high"]).all()
+
+    def test_chunks_and_jobs(self):
+        """Point estimates don't depend on chunking; nothing depends on threads"""
+        one = ngm.sensitivity.sobol_indices(ishigami, BOUNDS, N=1000, chunk_size=1000)
+        many = ngm.sensitivity.sobol_indices(ishigami, BOUNDS, N=1000, chunk_size=64)
+        assert_allclose(many["S1"], one["S1"])
+        assert_allclose(many["ST"], one["ST"])
+
+        threaded = ngm.sensitivity.sobol_indices(
+            ishigami, BOUNDS, N=1000, chunk_size=64, n_jobs=3
+        )
+        assert_frame_equal(threaded, many)
+
+
+class TestScenarioModel:
+    M_novax = np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]])
+    N_i = np.array([0.05, 0.45, 0.5]) * 1e7
+    n_vax = np.array([2.5e5, 2.5e5, 5e5])
+    p_severe = np.array([0.02, 0.06, 0.02])
+
+    def test_matches_run_ngm(self):
+        model = ngm.sensitivity.scenario_model(
+            self.M_novax, self.N_i, self.n_vax, 0.74, self.p_severe, G=10
+        )
+        current = model(
+            {
+                "ve": np.array([0.5, 0.9]),
+                "M_novax[0,2]": np.array([0.2, 0.4]),
+                "n_vax[1]": np.array([0.0, 1e6]),
+            }
+        )
+
+        for i, (ve, m, v) in enumerate([(0.5, 0.2, 0.0), (0.9, 0.4, 1e6)]):
+            M_novax = self.M_novax.copy()
+            M_novax[0, 2] = m
+            n_vax = self.n_vax.copy()
+            n_vax[1] = v
+            expected = ngm.run_ngm(M_novax, self.N_i, n_vax, ve)
+            severe = ngm.severity(
+                expected["Re"], expected["infection_distribution"], self.p_severe, 10
+            )
+            assert np.isclose(current["Re"][i], expected["Re"])
+            assert np.isclose(current["deaths_after_G_generations"][i], severe.sum())
+
+    def test_indices(self):
+        model = ngm.sensitivity.scenario_model(
+            self.M_novax, self.N_i, self.n_vax, 0.74, self.p_severe, G=10
+        )
+        df = ngm.sensitivity.sobol_indices(
+            model, {"ve": (0.5, 0.9), "p_severe[1]": (0.03, 0.09)}, N=4096
+        )
+        re = df.filter(output="Re")
+        # severity doesn't affect transmission
+        assert re["input"].to_list() == ["ve", "p_severe[1]"]
+        assert_allclose(re["S1"][1], 0.0)
+        assert_allclose(re["ST"][0], 1.0, atol=0.05)
+
+    def test_bad_input(self):
+        model = ngm.sensitivity.scenario_model(
+            self.M_novax, self.N_i, self.n_vax, 0.74, self.p_severe, G=10
+        )
+        with pytest.raises(ValueError, match="Unknown input"):
+            model({"beta": np.array([1.0])})
+        with pytest.raises(ValueError, match="Wrong number"):
+            model({"M_novax[0]": np.array([1.0])})
@@ -0,0 +1,158 @@
+import asyncio
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+import ngm
+import ngm.linalg
+import ngm.service
+
+M_novax = [[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]]
+n = [5e5, 4.5e6, 5e6]
+
+
+async def _with_service(f, **kwargs):
+    service = ngm.service.NGMService(**kwargs)
+    server = await service.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        return await f(port)
+    finally:
+        await service.stop(server)
+
+
+def test_dominant_eigen_batch():
+    X = np.array(
+        [
+            [[1.0, 2.0], [2.0, 1.0]],
+            [[3.1, 0.15], [0.78, 1.5]],
+        ]
+    )
+    current = ngm.linalg.dominant_eigen_batch(X)
+    for i in range(2):
+        expected = ngm.linalg.dominant_eigen(X[i])
+        assert np.isclose(current.value[i], expected.value)
+        assert_allclose(current.vector[i], expected.vector)
+
+
+def test_run_ngm_batched():
+    n_vaxes = [[0.0, 0.0, 0.0], [2.5e5, 2.5e5, 5e5], [5e5, 0.0, 1e6], [1e5, 1e6, 0.0]]
+
+    async def f(port):
+        return await asyncio.gather(
+            *[
+                ngm.service.request(
+                    "127.0.0.1",
+                    port,
+                    "/run_ngm",
+                    {"M_novax": M_novax, "n": n, "n_vax": n_vax, "ve": 0.74},
+                )
+                for n_vax in n_vaxes
+            ]
+        )
+
+    responses = asyncio.run(_with_service(f, batch_window=0.1))
+
+    for n_vax, (status, response) in zip(n_vaxes, responses):
+        assert status == 200
+        assert response["batch_size"] == len(n_vaxes)
+        assert response["latency_ms"] > 0.0
+        expected = ngm.run_ngm(np.array(M_novax), np.array(n), np.array(n_vax), ve=0.74)
+        assert np.isclose(response["Re"], expected["Re"])
+        assert_allclose(
+            response["infection_distribution"], expected["infection_distribution"]
+        )
+
+
+def test_backpressure():
+    payload = {"M_novax": M_novax, "n": n, "n_vax": [0.0, 0.0, 0.0], "ve": 0.74}
+
+    async def f(port):
+        return await asyncio.gather(
+            *[
+                ngm.service.request("127.0.0.1", port, "/run_ngm", payload)
+                for _ in range(5)
+            ]
+        )
+
+    responses = asyncio.run(_with_service(f, batch_window=0.2, max_pending=2))
+    statuses = sorted(status for status, _ in responses)
+    assert statuses == [200, 200, 503, 503, 503]
+
+
+def test_other_endpoints():
+    async def f(port):
+        return await asyncio.gather(
+            ngm.service.request(
+                "127.0.0.1",
+                port,
+                "/distribute_vaccines",
+                {"V": 2.0, "N_i": [1.0, 2.0, 3.0], "strategy": "0"},
+            ),
+            ngm.service.request(
+                "127.0.0.1",
+                port,
+                "/severity",
+                {
+                    "eigenvalue": 2.0,
+                    "eigenvector": [0.25, 0.75],
+                    "p_severe": [0.01, 0.0],
+                    "G": 3,
+                },
+            ),
+            ngm.service.request(
+                "127.0.0.1",
+                port,
+                "/run_ngm",
+                {"M_novax": M_novax, "n": n, "n_vax": [1e7, 0.0, 0.0], "ve": 0.74},
+            ),
+            ngm.service.request("127.0.0.1", port, "/health"),
+        )
+
+    (s1, dist), (s2, sev), (s3, err), (s4, _) = asyncio.run(_with_service(f))
+    assert s1 == 200
+    assert_allclose(dist["n_vax"], [1.0, 2.0 / 5, 3.0 / 5])
+    assert s2 == 200
+    assert_allclose(sev["severity"], [15.0 * 0.25 * 0.01, 0.0])
+    assert s3 == 400 and "AssertionError" in err["error"]
+    assert s4 == 200
+
+
+def test_bad_matrix_does_not_stop_batches(monkeypatch):
+    """A non-finite matrix, or a batch that fails outright, doesn't affect later requests"""
+    bad = [[np.inf, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+
+    def payload(M):
+        return {"M_novax": M, "n": n, "n_vax": [0.0, 0.0, 0.0], "ve": 0.74}
+
+    solve_batch = ngm.service._solve_batch
+    calls = []
+
+    def fail_once(Ms):
+        calls.append(1)
+        if len(calls) == 1:
+            raise MemoryError("out of memory")
+        return solve_batch(Ms)
+
+    monkeypatch.setattr(ngm.service, "_solve_batch", fail_once)
+
+    async def f(port):
+        out = []
+        for M in [bad, M_novax, M_novax]:
+            out.append(
+                await ngm.service.request("127.0.0.1", port, "/run_ngm", payload(M))
+            )
+        return out
+
+    (s1, err1), (s2, err2), (s3, ok) = asyncio.run(_with_service(f, batch_window=0.0))
+    assert s1 == 400 and "finite" in err1["error"]
+    assert s2 == 500 and "MemoryError" in err2["error"]
+    assert s3 == 200
+    assert np.isclose(
+        ok["Re"], ngm.run_ngm(np.array(M_novax), np.array(n), np.zeros(3), 0.74)["Re"]
+    )
+
+    # matrices that fail in the solver are isolated from the rest of their batch
+    results = solve_batch([np.array(bad), np.array(M_novax)])
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[1], ngm.linalg.Eigen)
@@ -0,0 +1,170 @@
+import subprocess
+import sys
+
+import numpy as np
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+
+import ngm.scenario
+import ngm.sweep
+
+
+def test_import_without_app():
+    """The library modules don't import the Streamlit app"""
+    code = "import sys, ngm.sweep; assert 'ngm.app' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def make_scenario(n_vax_total, ve=0.74):
+    return {
+        "group_names": ["core", "children", "adults"],
+        "n_total": 1e7,
+        "pop_props": [0.05, 0.45, 0.5],
+        "M_novax": np.array([[3.0, 0.0, 0.2], [0.10, 1.0, 0.5], [0.25, 1.0, 1.5]]),
+        "p_severe": np.array([0.02, 0.06, 0.02]),
+        "n_vax_total": n_vax_total,
+        "vax_strategy": "even",
+        "ve": ve,
+        "G": 10,
+    }
+
+
+@pytest.fixture
+def n_calls(monkeypatch):
+    calls = []
+    simulate = ngm.scenario.simulate_scenario
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return simulate(*args, **kwargs)
+
+    monkeypatch.setattr(ngm.scenario, "simulate_scenario", counted)
+    return calls
+
+
+def test_matches_simulate(tmp_path, n_calls):
+    scenarios = [make_scenario(V) for V in [0.0, 1e6, 2e6]]
+    store = ngm.sweep.ResultStore(tmp_path)
+    current = ngm.sweep.run_sweep(scenarios, store, chunk_size=2)
+
+    expected = pl.concat([ngm.scenario.simulate_scenario(s) for s in scenarios])
+    assert_frame_equal(current, expected)
+
+
+def test_resume_and_overlap(tmp_path, n_calls):
+    store = ngm.sweep.ResultStore(tmp_path)
+    first = ngm.sweep.run_sweep([make_scenario(V) for V in [0.0, 1e6]], store)
+    assert len(n_calls) == 2
+
+    # only the new scenario is run
+    second = ngm.sweep.run_sweep([make_scenario(V) for V in [1e6, 0.0, 3e6]], store)
+    assert len(n_calls) == 3
+    assert_frame_equal(second[:2], first.reverse())
+
+    # different inputs have different keys
+    ngm.sweep.run_sweep([make_scenario(0.0, ve=0.5)], store)
+    assert len(n_calls) == 4
+
+
+def test_restart_is_free(tmp_path, n_calls):
+    scenarios = [make_scenario(V) for V in np.linspace(0.0, 5e6, 10)]
+    store = ngm.sweep.ResultStore(tmp_path)
+    first = ngm.sweep.run_sweep(scenarios, store, chunk_size=3)
+    assert len(n_calls) == 10
+
+    assert_frame_equal(ngm.sweep.run_sweep(scenarios, store, chunk_size=3), first)
+    worker = ngm.sweep.SweepWorker(scenarios, chunk_size=3, store=store).start()
+    worker.wait(timeout=10.0)
+    assert_frame_equal(worker.results(), first)
+    assert len(n_calls) == 10
+
+
+def test_integrity(tmp_path, n_calls):
+    store = ngm.sweep.ResultStore(tmp_path)
+    scenario = make_scenario(1e6)
+    expected = ngm.sweep.run_sweep([scenario], store)
+
+    key = ngm.sweep.scenario_key(scenario)
+    data_path = next(tmp_path.glob(f"*/{key}.parquet"))
+    data_path.write_bytes(data_path.read_bytes()[:-10])
+
+    assert store.get(key) is None
+    assert key not in store
+    assert_frame_equal(ngm.sweep.run_sweep([scenario], store), expected)
+    assert len(n_calls) == 2
+
+
+def test_stale_results(tmp_path, n_calls, monkeypatch):
+    store = ngm.sweep.ResultStore(tmp_path)
+    scenario = make_scenario(1e6)
+    key = ngm.sweep.scenario_key(scenario)
+
+    # results from other code are keyed differently
+    with monkeypatch.context() as m:
+        m.setattr(ngm.sweep, "_code_hash", lambda: "other")
+        assert ngm.sweep.scenario_key(scenario) != key
+
+    # a stored result with other columns is recomputed
+    store.put(key, pl.DataFrame({"Re": [1.0]}))
+    current = ngm.sweep.run_sweep([scenario, make_scenario(2e6)], store)
+    assert len(n_calls) == 2
+    assert current.width > 1
+    assert_frame_equal(store.get(key), current[:1])
+
+
+def test_eviction(tmp_path):
+    store = ngm.sweep.ResultStore(tmp_path)
+    ngm.sweep.run_sweep([make_scenario(V) for V in [0.0, 1e6, 2e6]], store)
+    entry_size = store.size() / 3
+
+    store.max_bytes = int(2.5 * entry_size)
+    store.evict()
+    assert store.size() <= store.max_bytes
+    # the tracked size matches the directory
+    assert store.size() == ngm.sweep.ResultStore(tmp_path).size()
+    assert ngm.sweep.scenario_key(make_scenario(2e6)) in store
+
+
+def test_worker():
+    scenarios = [make_scenario(V) for V in np.linspace(0.0, 5e6, 7)]
+    worker = ngm.sweep.SweepWorker(scenarios, chunk_size=3).start()
+    worker.wait(timeout=10.0)
+
+    assert worker.done and worker.error is None
+    assert worker.progress() == 1.0
+    expected = pl.concat([ngm.scenario.simulate_scenario(s) for s in scenarios])
+    assert_frame_equal(worker.results(), expected)
+
+
+def test_worker_cancel():
+    scenarios = [make_scenario(V) for V in np.linspace(0.0, 5e6, 7)]
+    worker = ngm.sweep.SweepWorker(scenarios, chunk_size=1)
+    worker.cancel()
+    worker.start().wait(timeout=10.0)
+
+    assert worker.done and worker.cancelled
+    assert worker.progress() == 0.0
+    assert worker.results().height == 0
+
+
+def test_worker_failed_scenarios(tmp_path):
+    """A scenario that fails, e.g., full coverage with a perfect vaccine, gets NaN"""
+    scenarios = [make_scenario(V, ve=1.0) for V in [0.0, 1e7, 5e6]]
+    expected = ngm.scenario.simulate_scenario(scenarios[0])
+    assert_frame_equal(
+        ngm.scenario.failed_scenario(scenarios[1]).clear(), expected.clear()
+    )
+
+    for store in [None, ngm.sweep.ResultStore(tmp_path)]:
+        worker = ngm.sweep.SweepWorker(scenarios, chunk_size=3, store=store).start()
+        worker.wait(timeout=10.0)
+
+        assert worker.progress() == 1.0
+        assert isinstance(worker.error, AssertionError)
+        results = worker.results()
+        assert results["Re"].is_nan().to_list() == [False, True, False]
+        assert_frame_equal(results[:1], expected)
+
+    # failures aren't stored
+    assert ngm.sweep.scenario_key(scenarios[1]) not in store